@@ -127,16 +127,25 @@ def process_document(uploaded_file):
             
             logger.info(f"Processing: {tmp_path}")
             
-            # Process with RAG Pipeline
-            chunks = st.session_state.rag_pipeline.process_document(tmp_path)
-            st.info(f"✅ Created {len(chunks)} chunks from {uploaded_file.name}")
-            
-            # Add to vector store
-            st.session_state.rag_pipeline.create_from_documents(chunks)
-            st.info(f"✅ Added {len(chunks)} chunks to vector store")
-            
-            # Setup QA chain
-            st.session_state.rag_pipeline.setup_qa_chain()
+            if config.STREAMING_INGEST:
+                # Stream pages through split -> embed -> insert
+                progress = st.empty()
+                total_chunks = 0
+                for update in st.session_state.rag_pipeline.stream_ingest(tmp_path):
+                    total_chunks = update["total_chunks"]
+                    progress.info(f"⏳ Indexed {total_chunks} chunks (page {update['last_page']})...")
+                progress.info(f"✅ Added {total_chunks} chunks from {uploaded_file.name} to vector store")
+            else:
+                # Process with RAG Pipeline
+                chunks = st.session_state.rag_pipeline.process_document(tmp_path)
+                st.info(f"✅ Created {len(chunks)} chunks from {uploaded_file.name}")
+                
+                # Add to vector store
+                st.session_state.rag_pipeline.create_from_documents(chunks)
+                st.info(f"✅ Added {len(chunks)} chunks to vector store")
+                
+                # Setup QA chain
+                st.session_state.rag_pipeline.setup_qa_chain()
             st.info("✅ QA chain setup successfully")
             
             # Process with KG Pipeline
@@ -161,6 +170,11 @@ def process_document(uploaded_file):
 def display_hybrid_results(results: Dict[str, Any]):
     """Display hybrid retrieval results in a nice format"""
     
+    # Fused mode: one answer grounded in both sources
+    if results.get("mode") == "fused":
+        display_fused_results(results)
+        return
+    
     # Display RAG Results
     with st.expander("📚 Vector Store (RAG) Results", expanded=True):
         if results.get("rag_answer"):
@@ -204,6 +218,25 @@ def display_hybrid_results(results: Dict[str, Any]):
         else:
             st.warning("No Knowledge Graph results available")
     
+    display_result_status(results)
+
+def display_result_status(results: Dict[str, Any]):
+    """Display skipped backends, partial-result and cache notes, and the confidence score"""
+    # Display backends the query router skipped
+    if results.get("skipped"):
+        names = {"rag": "Vector Store", "kg": "Knowledge Graph"}
+        st.caption(f"🧭 Skipped by query router: {', '.join(names[name] for name in results['skipped'])}")
+    
+    # Display partial-result warning
+    if results.get("degraded"):
+        problems = [f"{name.upper()} timed out" for name in results.get("timed_out", [])]
+        problems += [f"{name.upper()} failed" for name in results.get("failed", [])]
+        st.caption(f"⏱️ Partial result: {', '.join(problems)}")
+    
+    # Display cache provenance
+    if results.get("cached"):
+        st.caption(f"⚡ Served from cache (similar question: \"{results.get('cached_question', '')}\")")
+    
     # Display Hybrid Score
     if results.get("confidence"):
         st.markdown("---")
@@ -215,6 +248,66 @@ def display_hybrid_results(results: Dict[str, Any]):
         else:
             st.error(f"❌ Confidence: {confidence.upper()}")
 
+def stream_hybrid_results(question: str) -> Dict[str, Any]:
+    """Render both answers token by token, then the full results"""
+    placeholder = st.empty()
+    answers = {"rag": "", "kg": ""}
+    results = None
+    
+    with placeholder.container():
+        if config.HYBRID_MODE == "fused":
+            st.markdown("**🔀 Answer:**")
+            rag_box = st.empty()
+            kg_box = None
+        else:
+            st.markdown("**📚 Vector Store (RAG):**")
+            rag_box = st.empty()
+            st.markdown("**🕸️ Knowledge Graph:**")
+            kg_box = st.empty()
+            kg_box.success("🤔 Thinking...")
+        rag_box.info("🤔 Thinking...")
+    
+    for event in st.session_state.hybrid_retriever.stream_query(question):
+        if event["event"] in ("rag_token", "fused_token"):
+            answers["rag"] += event["token"]
+            rag_box.info(answers["rag"] + "▌")
+        elif event["event"] == "kg_token":
+            answers["kg"] += event["token"]
+            kg_box.success(answers["kg"] + "▌")
+        elif event["event"] in ("rag_error", "kg_error"):
+            box = rag_box if event["event"] == "rag_error" else kg_box
+            box.error(f"❌ Answer failed: {event['error']}")
+        elif event["event"] == "result":
+            results = event["result"]
+    
+    # Replace the live view with the full results (sources, entities, confidence)
+    placeholder.empty()
+    display_hybrid_results(results)
+    return results
+
+def display_fused_results(results: Dict[str, Any]):
+    """Display a single fused answer with its sources and graph facts"""
+    with st.expander("🔀 Hybrid Answer (Vector Store + Knowledge Graph)", expanded=True):
+        st.info(results.get("answer") or "No answer available")
+        
+        if results.get("rag_sources"):
+            st.markdown("**📄 Sources:**")
+            for i, source in enumerate(results["rag_sources"], 1):
+                source_file = source.get('source', 'Unknown')
+                page = source.get('page', 'N/A')
+                st.markdown(f"- Source {i}: `{Path(source_file).name if source_file != 'Unknown' else 'Unknown'}`, page `{page}`")
+        
+        if results.get("kg_entities"):
+            st.markdown("**🏷️ Related Entities:**")
+            st.markdown(", ".join([f"`{e}`" for e in results["kg_entities"][:10]]))
+        
+        if results.get("kg_relations"):
+            st.markdown("**🔗 Key Relationships:**")
+            for i, rel in enumerate(results["kg_relations"][:5], 1):
+                st.markdown(f"{i}. {rel}")
+    
+    display_result_status(results)
+
 def display_sidebar():
     """Display sidebar with configuration and controls"""
     with st.sidebar:
@@ -257,6 +350,30 @@ def display_sidebar():
         
         st.markdown("---")
         
+        # Query router hit rates and skipped backend calls
+        retriever = st.session_state.hybrid_retriever
+        if retriever and retriever.router:
+            with st.expander("🧭 Query Routing", expanded=False):
+                stats = retriever.router_stats()
+                st.markdown(f"**Questions routed:** {stats.get('questions', 0)}")
+                for backend, label in (("rag", "Vector Store"), ("kg", "Knowledge Graph")):
+                    st.markdown(
+                        f"- {label}: {stats.get(f'{backend}_queried', 0)} queried, "
+                        f"{stats.get(f'{backend}_skipped', 0)} skipped"
+                    )
+                
+                if stats["hit_rates"]:
+                    st.markdown("**Hit rates:**")
+                    for key, rate in sorted(stats["hit_rates"].items()):
+                        st.markdown(f"- `{key}`: {rate:.0%}")
+                
+                if stats["skip_reasons"]:
+                    st.markdown("**Skip reasons:**")
+                    for reason, count in sorted(stats["skip_reasons"].items(), key=lambda item: -item[1]):
+                        st.markdown(f"- {reason}: {count}")
+            
+            st.markdown("---")
+        
         # System information
         with st.expander("ℹ️ System Information", expanded=False):
             st.markdown(f"""
@@ -265,7 +382,7 @@ def display_sidebar():
             - Embeddings: `{config.EMBEDDING_MODEL}`
             
             **Vector Store:**
-            - Database: Neon Postgres
+            - Database: {'Neon Postgres' if config.VECTOR_STORE_BACKEND == 'pgvector' else 'Local NumPy (mmap)'}
             - Collection: textbook_embeddings
             
             **Knowledge Graph:**
@@ -323,9 +440,10 @@ def main():
         
         # Get response
         with st.chat_message("assistant"):
-            with st.spinner("🤔 Thinking..."):
+            if config.STREAMING_ANSWERS:
                 try:
-                    results = st.session_state.hybrid_retriever.query(question)
+                    st.markdown("**Assistant:**")
+                    results = stream_hybrid_results(question)
                     
                     # Add assistant response to chat history
                     st.session_state.chat_history.append({
@@ -333,13 +451,27 @@ def main():
                         "content": results
                     })
                     
-                    # Display results
-                    st.markdown("**Assistant:**")
-                    display_hybrid_results(results)
-                    
                 except Exception as e:
                     logger.error(f"Query failed: {e}")
                     st.error(f"❌ Error: {str(e)}")
+            else:
+                with st.spinner("🤔 Thinking..."):
+                    try:
+                        results = st.session_state.hybrid_retriever.query(question)
+                        
+                        # Add assistant response to chat history
+                        st.session_state.chat_history.append({
+                            "role": "assistant",
+                            "content": results
+                        })
+                        
+                        # Display results
+                        st.markdown("**Assistant:**")
+                        display_hybrid_results(results)
+                        
+                    except Exception as e:
+                        logger.error(f"Query failed: {e}")
+                        st.error(f"❌ Error: {str(e)}")
         
         # Rerun to update chat display
         st.rerun()
@@ -0,0 +1,117 @@
+"""
+Benchmark serial vs scheduled embedding against a local stub server
+
+Usage: python benchmark_embeddings.py [num_texts] [latency_ms]
+"""
+import base64
+import json
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_openai import OpenAIEmbeddings
+
+from utilis.embedding_scheduler import EmbeddingScheduler
+
+DIMENSION = 1536
+MAX_CONCURRENT = 6  # Stub provider answers 429 above this many concurrent requests
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /embeddings endpoint with fixed latency"""
+    
+    latency = 0.2
+    active = 0
+    lock = threading.Lock()
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        
+        with StubEmbeddingHandler.lock:
+            StubEmbeddingHandler.active += 1
+            overloaded = StubEmbeddingHandler.active > MAX_CONCURRENT
+        
+        try:
+            if overloaded:
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}})
+                return
+            
+            time.sleep(self.latency + 0.0002 * len(texts))
+            
+            vector = [0.01] * DIMENSION
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"{DIMENSION}f", *vector)).decode()
+            
+            self._send(200, {
+                "object": "list",
+                "model": body.get("model", "stub"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector}
+                    for i in range(len(texts))
+                ],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            })
+        finally:
+            with StubEmbeddingHandler.lock:
+                StubEmbeddingHandler.active -= 1
+    
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    num_texts = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    StubEmbeddingHandler.latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000
+    batch_size = 128
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEmbeddingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    
+    texts = [f"chunk {i} " + "lorem ipsum " * 80 for i in range(num_texts)]
+    
+    def make_embeddings(max_retries: int) -> OpenAIEmbeddings:
+        return OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            openai_api_key="stub",
+            openai_api_base=base_url,
+            chunk_size=batch_size,
+            max_retries=max_retries,
+        )
+    
+    print(f"📊 Embedding {num_texts} texts, batch size {batch_size}, "
+          f"{StubEmbeddingHandler.latency * 1000:.0f}ms stub latency")
+    
+    # Baseline: LangChain's serial batching
+    start = time.time()
+    make_embeddings(max_retries=2).embed_documents(texts)
+    serial = time.time() - start
+    print(f"Serial:    {serial:6.2f}s  {num_texts / serial:8.0f} texts/s")
+    
+    # Scheduler with more in-flight requests than the stub allows, to exercise 429 backoff
+    scheduler = EmbeddingScheduler(
+        make_embeddings(max_retries=0),
+        batch_size=batch_size,
+        max_in_flight=MAX_CONCURRENT + 4,
+    )
+    start = time.time()
+    scheduler.embed_documents(texts)
+    scheduled = time.time() - start
+    print(f"Scheduled: {scheduled:6.2f}s  {num_texts / scheduled:8.0f} texts/s  "
+          f"({serial / scheduled:.1f}x, {scheduler.get_stats()})")
+    
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
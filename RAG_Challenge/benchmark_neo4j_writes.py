@@ -0,0 +1,83 @@
+"""
+Benchmark per-row MERGE writes against UNWIND-batched writes to Neo4j
+
+Usage: python benchmark_neo4j_writes.py [num_entities] [batch_size]
+
+Start the docker-compose Neo4j first and point NEO4J_URI/NEO4J_USER/
+NEO4J_PASSWORD at it (e.g. bolt://localhost:7689). Synthetic entities are
+prefixed with "__bench_" and deleted after each run.
+"""
+import random
+import sys
+import time
+
+from neo4j import GraphDatabase
+
+from config.config import config
+from utilis.graph_writer import GraphWriter
+
+PREFIX = "__bench_"
+LABELS = ["PERSON", "ORG", "GPE", "DATE", "EVENT"]
+RELATIONS = ["ruled", "founded", "located_in", "fought", "succeeded"]
+
+
+def synthetic_graph(num_entities: int):
+    """Entities with ~20% repeats and one relation per entity, like a real document"""
+    rng = random.Random(0)
+    names = [f"{PREFIX}entity_{i}" for i in range(int(num_entities * 0.8))]
+    entities = [{"text": rng.choice(names), "label": rng.choice(LABELS)} for _ in range(num_entities)]
+    relations = [
+        {"subject": rng.choice(names), "relation": rng.choice(RELATIONS), "object": rng.choice(names)}
+        for _ in range(num_entities)
+    ]
+    return entities, relations
+
+
+def cleanup(driver):
+    with driver.session() as session:
+        session.run(
+            f"MATCH (e:Entity) WHERE e.name STARTS WITH '{PREFIX}' "
+            "CALL { WITH e DETACH DELETE e } IN TRANSACTIONS OF 1000 ROWS"
+        ).consume()
+
+
+def main():
+    num_entities = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else config.KG_WRITE_BATCH_SIZE
+    
+    driver = GraphDatabase.driver(config.neo4j_uri, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD))
+    writer = GraphWriter(driver, batch_size=batch_size)
+    entities, relations = synthetic_graph(num_entities)
+    rows = len(entities) + len(relations)
+    
+    print(f"Writing {len(entities)} entities and {len(relations)} relations to {config.neo4j_uri}")
+    
+    try:
+        cleanup(driver)
+        
+        start = time.perf_counter()
+        writer.write_per_row(entities, relations)
+        per_row = time.perf_counter() - start
+        print(f"per-row    {per_row:8.2f}s   {rows / per_row:10.0f} rows/s")
+        
+        cleanup(driver)
+        
+        start = time.perf_counter()
+        batches = writer.write(entities, relations)
+        batched = time.perf_counter() - start
+        print(f"batched    {batched:8.2f}s   {rows / batched:10.0f} rows/s   ({len(batches)} batches of <= {batch_size})")
+        
+        for batch in batches:
+            if batch["failed"]:
+                print(f"  {batch['kind']:<10} {batch['rows']:6d} rows   FAILED")
+            else:
+                print(f"  {batch['kind']:<10} {batch['rows']:6d} rows   created {batch['created']:6d}   updated {batch['updated']:6d}")
+        
+        print(f"speedup    {per_row / batched:8.1f}x")
+    finally:
+        cleanup(driver)
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark search latency of the numpy vector store against pgvector
+
+Usage: python benchmark_vector_store.py [num_vectors] [num_queries]
+
+Uses random vectors, so no embedding API calls are made. The pgvector run
+needs Neon credentials and writes to a separate, temporary collection.
+"""
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.config import config
+from utilis.numpy_vector_store import NumpyVectorStore
+
+DIMENSION = 1536
+BENCHMARK_COLLECTION = "benchmark_embeddings"
+
+class RandomEmbeddings(Embeddings):
+    """Deterministic random vectors standing in for a real embedding model"""
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        rng = np.random.default_rng(abs(hash(text)) % 2**32)
+        return rng.standard_normal(DIMENSION).astype(np.float32).tolist()
+
+
+def measure(search, queries: np.ndarray, k: int = 5) -> dict:
+    """Return p50/p95/mean latency in milliseconds"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query.tolist(), k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "mean": float(np.mean(latencies)),
+    }
+
+
+def report(name: str, stats: dict):
+    print(f"{name:<10} p50 {stats['p50']:8.2f}ms   p95 {stats['p95']:8.2f}ms   mean {stats['mean']:8.2f}ms")
+
+
+def main():
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((num_vectors, DIMENSION), dtype=np.float32)
+    queries = rng.standard_normal((num_queries, DIMENSION), dtype=np.float32)
+    texts = [f"chunk {i}" for i in range(num_vectors)]
+    
+    print(f"📊 {num_vectors} vectors x {DIMENSION} dims, {num_queries} queries, k=5")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = NumpyVectorStore(RandomEmbeddings(), directory)
+        start = time.time()
+        for i in range(0, num_vectors, 10000):
+            store.add_embeddings(texts[i:i + 10000], vectors[i:i + 10000].tolist())
+        print(f"numpy insert: {time.time() - start:.1f}s")
+        report("numpy", measure(store.similarity_search_by_vector, queries))
+        
+        start = time.perf_counter()
+        store.batch_similarity_search_by_vectors(queries.tolist(), k=5)
+        print(f"numpy batch: {(time.perf_counter() - start) * 1000 / num_queries:.2f}ms per query")
+    
+    try:
+        from langchain_community.vectorstores import PGVector
+        from utilis import connection_pool
+        
+        store = PGVector(
+            connection_string=config.neon_connection_string,
+            embedding_function=RandomEmbeddings(),
+            collection_name=BENCHMARK_COLLECTION,
+            pre_delete_collection=True,
+            connection=connection_pool.get_engine(),
+        )
+    except Exception as e:
+        print(f"⚠️ Skipping pgvector: {e}")
+        return
+    
+    try:
+        start = time.time()
+        for i in range(0, num_vectors, 1000):
+            store.add_embeddings(texts[i:i + 1000], vectors[i:i + 1000].tolist())
+        print(f"pgvector insert: {time.time() - start:.1f}s")
+        report("pgvector", measure(store.similarity_search_by_vector, queries))
+    finally:
+        store.delete_collection()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,16 +24,110 @@ class Config:
         self.NEON_DB_PASSWORD = os.getenv("NEON_DB_PASSWORD")
         self.NEON_DB_PORT = os.getenv("NEON_DB_PORT", "5432")
         
+        # Vector store backend: "pgvector" (Neon) or "numpy" (local memory-mapped file)
+        self.VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pgvector")
+        
+        # Postgres connection pool shared by every vector-store operation
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "5"))
+        self.DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Max connection age (s)
+        self.DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # Replace connections idle longer (s)
+        
         # Neo4j Configuration
         self.NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
         self.NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
         
+        # Knowledge graph writes: UNWIND batches in explicit write transactions
+        self.KG_BATCH_WRITES = os.getenv("KG_BATCH_WRITES", "false").lower() == "true"
+        self.KG_WRITE_BATCH_SIZE = int(os.getenv("KG_WRITE_BATCH_SIZE", "1000"))
+        
+        # Merge entities across documents on canonical keys ("INDIA" -> "India");
+        # run `python setup_neo4j.py migrate-keys` on an existing graph first
+        self.KG_CANONICAL_KEYS = os.getenv("KG_CANONICAL_KEYS", "false").lower() == "true"
+        
+        # Create the Entity.name constraint and type indexes on startup (or run setup_neo4j.py)
+        self.KG_SCHEMA_BOOTSTRAP = os.getenv("KG_SCHEMA_BOOTSTRAP", "false").lower() == "true"
+        
+        # Batched spaCy NER during graph building (nlp.pipe batch size and worker processes)
+        self.NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "64"))
+        self.NER_N_PROCESS = int(os.getenv("NER_N_PROCESS", "1"))
+        
+        # LLM relation extraction: concurrent requests, rate budgets and per-chunk retries
+        self.KG_EXTRACTION_WORKERS = int(os.getenv("KG_EXTRACTION_WORKERS", "4"))
+        self.KG_EXTRACTION_RPM = int(os.getenv("KG_EXTRACTION_RPM", "500"))
+        self.KG_EXTRACTION_TPM = int(os.getenv("KG_EXTRACTION_TPM", "200000"))
+        self.KG_EXTRACTION_RETRIES = int(os.getenv("KG_EXTRACTION_RETRIES", "3"))
+        
+        # Packed extraction: several chunks per request (input token budget) with JSON replies
+        self.KG_PACKED_EXTRACTION = os.getenv("KG_PACKED_EXTRACTION", "false").lower() == "true"
+        self.KG_PACK_TOKEN_BUDGET = int(os.getenv("KG_PACK_TOKEN_BUDGET", "3000"))
+        self.KG_PACK_MAX_CHUNKS = int(os.getenv("KG_PACK_MAX_CHUNKS", "8"))
+        self.KG_JSON_MODE = os.getenv("KG_JSON_MODE", "true").lower() == "true"
+        
+        # Windowed extraction: long texts are read in overlapping windows instead of being cut off
+        self.KG_WINDOWED_EXTRACTION = os.getenv("KG_WINDOWED_EXTRACTION", "false").lower() == "true"
+        self.KG_WINDOW_CHARS = int(os.getenv("KG_WINDOW_CHARS", "2500"))
+        self.KG_WINDOW_OVERLAP = int(os.getenv("KG_WINDOW_OVERLAP", "200"))
+        self.NER_WINDOW_CHARS = int(os.getenv("NER_WINDOW_CHARS", "100000"))
+        self.KG_DOC_TOKEN_BUDGET = int(os.getenv("KG_DOC_TOKEN_BUDGET", "0"))  # Estimated LLM tokens per document, 0 = no limit
+        
+        # Entity lookup: full-text index (fuzzy/prefix, scored), with the CONTAINS scan as fallback
+        self.KG_FULLTEXT_SEARCH = os.getenv("KG_FULLTEXT_SEARCH", "false").lower() == "true"
+        self.KG_CONTAINS_FALLBACK = os.getenv("KG_CONTAINS_FALLBACK", "true").lower() == "true"
+        self.KG_SINGLE_QUERY = os.getenv("KG_SINGLE_QUERY", "false").lower() == "true"  # One UNWIND query per question
+        
         # RAG Configuration
         self.CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
         self.CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
         self.TOP_K = int(os.getenv("TOP_K", "5"))
         
+        # In-process LRU/TTL cache for question embeddings and retrieval results
+        self.QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+        self.QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "3600"))
+        
+        # Semantic answer cache in front of the hybrid retriever
+        self.SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+        self.SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+        self.SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+        
+        # Hybrid retrieval: query RAG and KG concurrently with per-backend timeouts (seconds)
+        self.HYBRID_CONCURRENT = os.getenv("HYBRID_CONCURRENT", "false").lower() == "true"
+        self.RAG_TIMEOUT = float(os.getenv("RAG_TIMEOUT", "30"))
+        self.KG_TIMEOUT = float(os.getenv("KG_TIMEOUT", "20"))
+        
+        # Worker threads per backend. A timed-out call is not cancelled: it holds its
+        # worker until it returns, and while every worker of a backend is held, new
+        # queries report that backend as timed out instead of queueing behind them.
+        self.HYBRID_BACKEND_WORKERS = int(os.getenv("HYBRID_BACKEND_WORKERS", "4"))
+        
+        # Query router: skip a backend when the question has no graph terms or its hit rate is low
+        self.QUERY_ROUTING_ENABLED = os.getenv("QUERY_ROUTING_ENABLED", "false").lower() == "true"
+        self.ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "20"))
+        self.ROUTER_MIN_HIT_RATE = float(os.getenv("ROUTER_MIN_HIT_RATE", "0.2"))
+        self.ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", "0.1"))
+        
+        # "separate": RAG and KG each answer; "fused": one completion over both contexts
+        self.HYBRID_MODE = os.getenv("HYBRID_MODE", "separate")
+        self.FUSED_CONTEXT_TOKENS = int(os.getenv("FUSED_CONTEXT_TOKENS", "3000"))
+        
+        # Stream answer tokens into the chat UI as the LLM produces them
+        self.STREAMING_ANSWERS = os.getenv("STREAMING_ANSWERS", "false").lower() == "true"
+        
+        # Streaming ingest: chunks per embed/insert batch and queue depth between stages
+        self.STREAMING_INGEST = os.getenv("STREAMING_INGEST", "false").lower() == "true"
+        self.INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self.INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+        
+        # OCR Configuration
+        self.OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+        self.OCR_PAGES_PER_TASK = int(os.getenv("OCR_PAGES_PER_TASK", "4"))
+        self.OCR_MAX_MEMORY_MB = int(os.getenv("OCR_MAX_MEMORY_MB", "1024"))
+        self.OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+        self.OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "50"))
+        
         # Paths
         self.BASE_DIR = Path(__file__).parent.parent
         self.DATA_DIR = self.BASE_DIR / "data"
@@ -42,6 +136,40 @@ class Config:
         # Create directories if they don't exist
         self.DATA_DIR.mkdir(exist_ok=True)
         self.UPLOAD_DIR.mkdir(exist_ok=True)
+        
+        # Directory of the numpy vector store backend
+        self.NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", str(self.DATA_DIR / "vector_store"))
+        
+        # Embedding cache (SQLite, keyed by hash of model name + chunk text)
+        self.EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        self.EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", str(self.DATA_DIR / "embedding_cache.sqlite"))
+        self.EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+        
+        # Extraction cache (SQLite, keyed by hash of models + prompt version + chunk text)
+        self.EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+        self.EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", str(self.DATA_DIR / "extraction_cache.sqlite"))
+        self.EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+        
+        # Embedding scheduler: batch size, in-flight cap and provider rate budgets
+        self.EMBEDDING_SCHEDULER_ENABLED = os.getenv("EMBEDDING_SCHEDULER_ENABLED", "false").lower() == "true"
+        self.EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+        self.EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "8"))
+        self.EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+        self.EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+        
+        # Bulk vector insertion (binary COPY or multi-row INSERT)
+        self.BULK_INSERT_ENABLED = os.getenv("BULK_INSERT_ENABLED", "false").lower() == "true"
+        self.BULK_INSERT_METHOD = os.getenv("BULK_INSERT_METHOD", "copy")
+        self.BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "1000"))
+        self.BULK_INSERT_TRANSACTION_SIZE = int(os.getenv("BULK_INSERT_TRANSACTION_SIZE", "10000"))
+        
+        # pgvector ANN index: build parameters (setup_neon.py) and per-session search parameters
+        self.VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+        self.HNSW_M = int(os.getenv("HNSW_M", "16"))
+        self.HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+        self.HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+        self.IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))
+        self.IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
     
     @property
     def neo4j_uri(self):
@@ -73,9 +201,17 @@ class Config:
         """Validate configuration"""
         required_vars = [
             ("OPENAI_API_KEY", self.OPENAI_API_KEY),
-            ("NEON_DB_HOST", self.NEON_DB_HOST),
-            ("NEON_DB_USER", self.NEON_DB_USER),
-            ("NEON_DB_PASSWORD", self.NEON_DB_PASSWORD),
+        ]
+        
+        # Neon credentials are only needed for the pgvector backend
+        if self.VECTOR_STORE_BACKEND == "pgvector":
+            required_vars += [
+                ("NEON_DB_HOST", self.NEON_DB_HOST),
+                ("NEON_DB_USER", self.NEON_DB_USER),
+                ("NEON_DB_PASSWORD", self.NEON_DB_PASSWORD),
+            ]
+        
+        required_vars += [
             ("NEO4J_URI", self.NEO4J_URI),
             ("NEO4J_USER", self.NEO4J_USER),
             ("NEO4J_PASSWORD", self.NEO4J_PASSWORD),
@@ -2,7 +2,9 @@
 Knowledge Graph Pipeline for entity extraction and relationship building
 """
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import time
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 
 from langchain_community.document_loaders import PyPDFLoader
@@ -13,9 +15,71 @@ from neo4j import GraphDatabase
 import spacy
 
 from config.config import config
+from utilis.disk_cache import SQLiteCache
+from utilis.entity_aggregator import EntityAggregator
+from utilis.extraction_cache import ExtractionCache
+from utilis.graph_schema import FULLTEXT_INDEX, ensure_schema, unkeyed_entity_count
+from utilis.graph_writer import GraphWriter
+from utilis.relation_extractor import RelationExtractor
+from utilis.text_windows import WindowPlan, extract_windows, merge_window_entities, sliding_windows
 
 logger = logging.getLogger(__name__)
 
+NO_GRAPH_RESULTS = "No relevant information found in the knowledge graph."
+
+# Shared RETURN columns of (e)-[r]->(related) rows, so every lookup path renders
+# relations the same way (the relation name is r.type on RELATES edges)
+RELATION_ROW_COLUMNS = """e.name AS entity, e.type AS type, coalesce(r.type, type(r)) AS relation,
+       related.name AS related_entity"""
+
+# One question entity via the full-text index, best matches first
+FULLTEXT_ENTITY_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $search, {limit: $limit})
+YIELD node AS e, score
+OPTIONAL MATCH (e)-[r]->(related)
+RETURN """ + RELATION_ROW_COLUMNS + """, score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+# One question entity via a CONTAINS scan over all Entity names
+CONTAINS_ENTITY_QUERY = """
+MATCH (e:Entity)
+WHERE toLower(e.name) CONTAINS toLower($entity)
+OPTIONAL MATCH (e)-[r]->(related)
+RETURN """ + RELATION_ROW_COLUMNS + """
+LIMIT $limit
+"""
+
+# All question entities in one round trip: matches are merged per node (best
+# score), ranked by score then degree, and relation rows are deduplicated
+# before a single global LIMIT.
+FULLTEXT_ENTITIES_QUERY = """
+UNWIND $searches AS search
+CALL db.index.fulltext.queryNodes($index, search, {limit: $limit}) YIELD node, score
+WITH node AS e, max(score) AS score
+WITH e, score, size([(e)--() | 1]) AS degree
+OPTIONAL MATCH (e)-[r]->(related)
+RETURN DISTINCT """ + RELATION_ROW_COLUMNS + """,
+       score, degree, coalesce(r.mentions, 0) AS mentions
+ORDER BY score DESC, degree DESC, mentions DESC
+LIMIT $limit
+"""
+
+# Same shape without the index; the score is the share of the name a term covers
+CONTAINS_ENTITIES_QUERY = """
+UNWIND $entities AS term
+MATCH (e:Entity)
+WHERE toLower(e.name) CONTAINS toLower(term)
+WITH e, max(toFloat(size(term)) / size(e.name)) AS score
+WITH e, score, size([(e)--() | 1]) AS degree
+OPTIONAL MATCH (e)-[r]->(related)
+RETURN DISTINCT """ + RELATION_ROW_COLUMNS + """,
+       score, degree, coalesce(r.mentions, 0) AS mentions
+ORDER BY score DESC, degree DESC, mentions DESC
+LIMIT $limit
+"""
+
 class KGPipeline:
     """Knowledge Graph Pipeline for building and querying knowledge graphs"""
     
@@ -35,6 +99,32 @@ class KGPipeline:
                 session.run("RETURN 1")
         
             logger.info("✅ Neo4j Knowledge Graph initialized")
+            
+            # Constraint/indexes so MERGE and lookups are index seeks, not label scans
+            if config.KG_SCHEMA_BOOTSTRAP:
+                try:
+                    ensure_schema(self.driver)
+                except Exception as e:
+                    logger.warning(f"⚠️ Graph schema bootstrap failed: {e}")
+            
+            # Canonical keys only once every existing node has one, otherwise a
+            # MERGE on canonical_key would duplicate unkeyed nodes
+            canonical_keys = config.KG_CANONICAL_KEYS
+            if canonical_keys:
+                unkeyed = unkeyed_entity_count(self.driver)
+                if unkeyed:
+                    logger.warning(
+                        f"⚠️ {unkeyed} entities have no canonical key, merging on names until "
+                        f"`python setup_neo4j.py migrate-keys` has run"
+                    )
+                    canonical_keys = False
+            
+            # Batched UNWIND writer for entities and relations
+            self.graph_writer = GraphWriter(
+                self.driver,
+                batch_size=config.KG_WRITE_BATCH_SIZE,
+                canonical_keys=canonical_keys,
+            )
         
             # Initialize NLP model for entity extraction
             try:
@@ -52,6 +142,37 @@ class KGPipeline:
                 openai_api_key=config.OPENAI_API_KEY
             )
         
+            # Concurrent, rate-limited relation extraction over document chunks
+            self.relation_extractor = RelationExtractor(
+                self.llm,
+                max_workers=config.KG_EXTRACTION_WORKERS,
+                requests_per_minute=config.KG_EXTRACTION_RPM,
+                tokens_per_minute=config.KG_EXTRACTION_TPM,
+                max_retries=config.KG_EXTRACTION_RETRIES,
+                packed=config.KG_PACKED_EXTRACTION,
+                pack_token_budget=config.KG_PACK_TOKEN_BUDGET,
+                pack_max_chunks=config.KG_PACK_MAX_CHUNKS,
+                json_mode=config.KG_JSON_MODE,
+            )
+            
+            # Long texts are read in overlapping windows that fit the LLM limit
+            self.window_chars = None
+            if config.KG_WINDOWED_EXTRACTION:
+                self.window_chars = min(config.KG_WINDOW_CHARS, self.relation_extractor.max_chars - 1)
+            
+            # Persistent per-chunk cache of extracted entities and relations
+            self.extraction_cache = None
+            if config.EXTRACTION_CACHE_ENABLED:
+                spacy_model = f"{self.nlp.meta.get('lang')}_{self.nlp.meta.get('name')}-{self.nlp.meta.get('version')}"
+                prompt_version = self.relation_extractor.prompt_version
+                if self.window_chars:
+                    prompt_version += f"|w{self.window_chars}-{config.KG_WINDOW_OVERLAP}"
+                self.extraction_cache = ExtractionCache(
+                    SQLiteCache(config.EXTRACTION_CACHE_PATH, config.EXTRACTION_CACHE_MAX_MB),
+                    model_name=f"{config.LLM_MODEL}|{spacy_model}",
+                    prompt_version=prompt_version,
+                )
+            
             # Text splitter
             self.text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=1000,
@@ -72,122 +193,124 @@ class KGPipeline:
                 self.driver = None
             raise
     
-    def extract_entities_and_relations(self, text: str) -> Dict[str, Any]:
-        """Extract entities and relationships from text using spaCy and LLM"""
+    @staticmethod
+    def _doc_entities(doc) -> List[Dict[str, Any]]:
+        """Entity dicts for a spaCy Doc"""
+        entities = []
+        for ent in doc.ents:
+            entities.append({
+                "text": ent.text,
+                "label": ent.label_,
+                "start": ent.start_char,
+                "end": ent.end_char
+            })
+        return entities
+    
+    def _ner_disabled_pipes(self) -> List[str]:
+        """Pipeline components NER does not need (keeps a shared tok2vec if NER listens to it)"""
+        keep = {"ner"}
+        for name, pipe in self.nlp.pipeline:
+            if "ner" in getattr(pipe, "listening_components", []):
+                keep.add(name)
+        return [name for name in self.nlp.pipe_names if name not in keep]
+    
+    def extract_entities_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Run NER over many texts in one nlp.pipe pass, with unused components disabled
+        
+        In windowed mode long texts are split into overlapping windows and the
+        entities are merged back into offsets of the full text.
+        """
+        if config.KG_WINDOWED_EXTRACTION:
+            windows = [sliding_windows(text, config.NER_WINDOW_CHARS, config.KG_WINDOW_OVERLAP) for text in texts]
+        else:
+            windows = [[(0, text[:100000])] for text in texts]  # Limit text length
+        
+        docs = self.nlp.pipe(
+            (window for text_windows in windows for _, window in text_windows),
+            batch_size=config.NER_BATCH_SIZE,
+            n_process=config.NER_N_PROCESS,
+            disable=self._ner_disabled_pipes(),
+        )
+        
+        results = []
+        for text_windows in windows:
+            window_entities = [self._doc_entities(next(docs)) for _ in text_windows]
+            results.append(merge_window_entities(text_windows, window_entities))
+        return results
+    
+    def _plan_windows(self, texts: List[str]) -> WindowPlan:
+        """Plan the LLM windows for one document's texts under the per-document token budget"""
+        return WindowPlan(
+            texts,
+            self.window_chars,
+            config.KG_WINDOW_OVERLAP,
+            self.relation_extractor.request_tokens,
+            token_budget=config.KG_DOC_TOKEN_BUDGET,
+            max_chars=self.relation_extractor.max_chars,
+        )
+    
+    def extract_entities_and_relations(self, text: str,
+                                       entities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Extract entities and relationships from text using spaCy and LLM
+        
+        Pass entities already found by extract_entities_batch to skip the spaCy step.
+        """
         try:
+            # Serve text extracted before from the cache
+            if self.extraction_cache:
+                cached = self.extraction_cache.get(text)
+                if cached is not None:
+                    return cached
+            
             # Use spaCy for basic entity extraction
-            doc = self.nlp(text[:100000])  # Limit text length
-            
-            entities = []
-            for ent in doc.ents:
-                entities.append({
-                    "text": ent.text,
-                    "label": ent.label_,
-                    "start": ent.start_char,
-                    "end": ent.end_char
-                })
-            
-            # Extract relationships using LLM
-            prompt = PromptTemplate(
-                input_variables=["text"],
-                template="""
-                Extract key relationships from the following text.
-                Format: Subject -> Relationship -> Object
-                
-                Text: {text}
-                
-                Relationships:
-                """
-            )
+            if entities is None:
+                entities = self.extract_entities_batch([text])[0]
             
-            # Get relationships from LLM
-            relations = []
-            if len(text) < 3000:  # Only use LLM for shorter texts
-                try:
-                    response = self.llm.invoke(prompt.format(text=text))
-                    relations_text = response.content if hasattr(response, 'content') else str(response)
-                    
-                    # Parse relationships
-                    for line in relations_text.split('\n'):
-                        if '->' in line:
-                            parts = line.split('->')
-                            if len(parts) == 3:
-                                relations.append({
-                                    "subject": parts[0].strip(),
-                                    "relation": parts[1].strip(),
-                                    "object": parts[2].strip()
-                                })
-                except Exception as e:
-                    logger.warning(f"LLM relation extraction failed: {e}")
+            # Extract relationships using LLM, window by window (failures retried)
+            plan = self._plan_windows([text])
+            _, relations = next(extract_windows(self.relation_extractor, plan))
             
-            return {
+            result = {
                 "entities": entities,
-                "relations": relations
+                "relations": relations or []
             }
             
+            # Failed or budget-truncated extractions are not cached, so the next run retries them
+            if self.extraction_cache and relations is not None and plan.complete(0):
+                self.extraction_cache.set(text, result)
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Entity extraction failed: {e}")
             return {"entities": [], "relations": []}
     
-    def add_to_graph(self, entities: List[Dict], relations: List[Dict]):
-        """Add entities and relationships to Neo4j graph with duplicate handling"""
+    def add_to_graph(self, entities: List[Dict], relations: List[Dict]) -> List[Dict[str, Any]]:
+        """Add entities and relationships to Neo4j graph with duplicate handling
+        
+        Returns created/updated counts per written batch (empty when batching is disabled).
+        """
         try:
-            with self.driver.session() as session:
-                entities_added = 0
-                relations_added = 0
-                
-                # Add entities with MERGE (handles duplicates gracefully)
-                for entity in entities:
-                    try:
-                        result = session.run(
-                            """
-                            MERGE (e:Entity {name: $name})
-                            ON CREATE SET e.type = $type, e.created = timestamp()
-                            ON MATCH SET e.type = $type, e.updated = timestamp()
-                            RETURN e
-                            """,
-                            name=entity["text"],
-                            type=entity["label"]
-                        )
-                        if result.single():
-                            entities_added += 1
-                    except Exception as e:
-                        logger.debug(f"Entity already exists: {entity['text']}")
-                        continue
-                
-                # Add relationships with MERGE (handles duplicates gracefully)
-                for relation in relations:
-                    try:
-                        result = session.run(
-                            """
-                            MERGE (s:Entity {name: $subject})
-                            MERGE (o:Entity {name: $object})
-                            MERGE (s)-[r:RELATES {type: $relation}]->(o)
-                            ON CREATE SET r.created = timestamp()
-                            ON MATCH SET r.updated = timestamp()
-                            RETURN r
-                            """,
-                            subject=relation["subject"],
-                            object=relation["object"],
-                            relation=relation["relation"]
-                        )
-                        if result.single():
-                            relations_added += 1
-                    except Exception as e:
-                        logger.debug(f"Relation already exists")
-                        continue
-                
-                logger.info(f"✅ Added/Updated {entities_added} entities and {relations_added} relations")
-                
+            if config.KG_BATCH_WRITES:
+                return self.graph_writer.write(entities, relations)
+            
+            self.graph_writer.write_per_row(entities, relations)
+            
         except Exception as e:
             logger.error(f"Failed to add to graph: {e}")
             # Don't raise - allow processing to continue
             logger.warning("⚠️ Continuing despite graph errors...")
-
-
-    def process_document(self, pdf_path: str):
-        """Process PDF document and build knowledge graph"""
+        
+        return []
+    
+    def process_document(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """Process PDF document and build knowledge graph
+        
+        Returns the document's extraction throughput and coverage report.
+        """
         try:
+            started = time.perf_counter()
+            
             # Load document
             loader = PyPDFLoader(pdf_path)
             documents = loader.load()
@@ -197,84 +320,107 @@ class KGPipeline:
             
             logger.info(f"Processing {len(chunks)} chunks for KG")
             
-            all_entities = []
-            all_relations = []
+            # Duplicate mentions are collapsed in memory; only distinct entities are written
+            aggregator = EntityAggregator()
+            
+            texts = [chunk.page_content for chunk in chunks]
+            
+            # Chunks extracted before (same text, models and prompt) skip spaCy and the LLM
+            cached = self.extraction_cache.get_many(texts) if self.extraction_cache else {}
+            for result in cached.values():
+                aggregator.add_entities(result["entities"])
+                aggregator.add_relations(result["relations"])
+            if cached:
+                logger.info(f"♻️ Reusing cached extractions for {len(cached)}/{len(texts)} chunks")
+            
+            pending = [i for i in range(len(texts)) if i not in cached]
+            pending_texts = [texts[i] for i in pending]
             
-            # Process each chunk
-            for i, chunk in enumerate(chunks):
-                if i % 20 == 0:
-                    logger.info(f"📊 Processing document {i}/{len(chunks)}...")
+            # Named entities for every remaining chunk in one batched spaCy pass
+            logger.info(f"🏷️ Running NER over {len(pending)} chunks...")
+            chunk_entities = self.extract_entities_batch(pending_texts)
+            
+            # Windows sent to the LLM, in document order, under the per-document token budget
+            plan = self._plan_windows(pending_texts)
+            
+            # Relations are extracted concurrently; each chunk's results are
+            # buffered for the graph writer as soon as all its windows finish
+            for done, (i, relations) in enumerate(extract_windows(self.relation_extractor, plan), 1):
+                if done % 20 == 0:
+                    logger.info(f"📊 Extracted relations for {done}/{len(pending)} chunks...")
+                
+                result = {"entities": chunk_entities[i], "relations": relations or []}
+                aggregator.add_entities(result["entities"])
+                aggregator.add_relations(result["relations"])
                 
-                result = self.extract_entities_and_relations(chunk.page_content)
-                all_entities.extend(result["entities"])
-                all_relations.extend(result["relations"])
+                # Failed or budget-truncated extractions are not cached, so the next run retries them
+                if self.extraction_cache and relations is not None and plan.complete(i):
+                    self.extraction_cache.set(pending_texts[i], result)
                 
                 # Add to graph in batches to avoid memory issues
-                if len(all_entities) >= 100:
-                    self.add_to_graph(all_entities, all_relations)
-                    all_entities = []
-                    all_relations = []
+                if aggregator.entity_count >= config.KG_WRITE_BATCH_SIZE:
+                    self.add_to_graph(*aggregator.drain())
             
             # Add remaining entities and relations
-            if all_entities or all_relations:
-                self.add_to_graph(all_entities, all_relations)
+            entities, relations = aggregator.drain()
+            if entities or relations:
+                self.add_to_graph(entities, relations)
+            
+            logger.info(
+                f"🧮 Aggregated {aggregator.stats['entity_mentions']} entity mentions into "
+                f"{aggregator.stats['entities']} distinct writes, {aggregator.stats['relation_mentions']} "
+                f"relation mentions into {aggregator.stats['relations']}"
+            )
             
             # Get final stats
             stats = self.get_graph_stats()
             logger.info(f"✅ Knowledge graph built: {stats['num_nodes']} entities, {stats['num_relationships']} relations")
+            logger.info(f"📈 Relation extraction: {self.relation_extractor.stats}")
+            if self.extraction_cache:
+                logger.info(f"📈 Extraction cache: {self.extraction_cache.stats()}")
             
+            # Per-document throughput and how much of the text the LLM actually read
+            elapsed = time.perf_counter() - started
+            cached_chars = sum(len(texts[i]) for i in cached)
+            total_chars = cached_chars + plan.total_chars
+            report = {
+                "document": Path(pdf_path).name,
+                "chunks": len(texts),
+                "cached_chunks": len(cached),
+                "windows": plan.total_windows,
+                "llm_windows": len(plan.windows) - plan.too_long,
+                "skipped_windows": plan.skipped_windows,
+                "estimated_tokens": plan.tokens,
+                "token_budget": config.KG_DOC_TOKEN_BUDGET,
+                "coverage": round((cached_chars + plan.covered_chars) / total_chars, 4) if total_chars else 1.0,
+                "seconds": round(elapsed, 2),
+                "chunks_per_second": round(len(texts) / elapsed, 2) if elapsed else 0.0,
+                "chars_per_second": round(total_chars / elapsed) if elapsed else 0,
+            }
+            logger.info(
+                f"⏱️ {report['document']}: {report['chunks']} chunks in {report['seconds']}s "
+                f"({report['chunks_per_second']} chunks/s), {report['coverage']:.1%} of text extracted, "
+                f"~{report['estimated_tokens']} tokens"
+            )
+            return report
+        
         except Exception as e:
             logger.error(f"Document processing failed: {e}")
             # Don't raise - allow RAG to continue working
             logger.warning("⚠️ KG processing failed, but RAG will still work")
+            return None
     
-    def query_graph(self, question: str, limit: int = 10) -> Dict[str, Any]:
+    def query_graph(self, question: str, limit: int = 10,
+                    query_entities: Optional[List[str]] = None) -> Dict[str, Any]:
         """Query the knowledge graph"""
         try:
-            # Extract key entities from question
-            doc = self.nlp(question)
-            query_entities = [ent.text for ent in doc.ents]
-            
-            if not query_entities:
-                # Use noun chunks if no entities found
-                query_entities = [chunk.text for chunk in doc.noun_chunks][:3]
-            
-            results = {
-                "entities": [],
-                "relations": [],
-                "answer": ""
-            }
-            
-            with self.driver.session() as session:
-                # Find related entities and relationships
-                for entity in query_entities:
-                    # Get entity and its relationships
-                    result = session.run(
-                        """
-                        MATCH (e:Entity)
-                        WHERE toLower(e.name) CONTAINS toLower($entity)
-                        OPTIONAL MATCH (e)-[r]->(related)
-                        RETURN e.name as entity, e.type as type, 
-                               type(r) as relation, related.name as related_entity
-                        LIMIT $limit
-                        """,
-                        entity=entity,
-                        limit=limit
-                    )
-                    
-                    for record in result:
-                        if record["entity"]:
-                            results["entities"].append(record["entity"])
-                        
-                        if record["relation"] and record["related_entity"]:
-                            relation_text = f"{record['entity']} -> {record['relation']} -> {record['related_entity']}"
-                            results["relations"].append(relation_text)
+            results = self.retrieve_graph(question, limit, query_entities)
             
             # Generate answer from graph results
             if results["entities"] or results["relations"]:
                 results["answer"] = self._generate_answer_from_graph(question, results)
             else:
-                results["answer"] = "No relevant information found in the knowledge graph."
+                results["answer"] = NO_GRAPH_RESULTS
             
             return results
             
@@ -286,29 +432,133 @@ class KGPipeline:
                 "answer": f"Query failed: {str(e)}"
             }
     
-    def _generate_answer_from_graph(self, question: str, graph_results: Dict) -> str:
-        """Generate natural language answer from graph results"""
-        try:
-            context = f"""
+    def retrieve_graph(self, question: str, limit: int = 10,
+                       query_entities: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Find entities and relationships related to a question, without calling the LLM"""
+        # Extract key entities from question, unless the caller already did
+        if query_entities is None:
+            doc = self.nlp(question)
+            query_entities = [ent.text for ent in doc.ents]
+            
+            if not query_entities:
+                # Use noun chunks if no entities found
+                query_entities = [chunk.text for chunk in doc.noun_chunks][:3]
+        
+        results = {
+            "entities": [],
+            "relations": [],
+            "scores": {},
+            "answer": ""
+        }
+        
+        with self.driver.session() as session:
+            if config.KG_SINGLE_QUERY:
+                # One query for all entities, deduplicated and ranked on the server
+                records = self._search_entities(session, query_entities, limit)
+            else:
+                # Find related entities and relationships, one query per entity
+                records = [
+                    record for entity in query_entities
+                    for record in self._search_entity(session, entity, limit)
+                ]
+            
+            for record in records:
+                # Get entity and its relationships
+                if record["entity"]:
+                    if not (config.KG_SINGLE_QUERY and record["entity"] in results["entities"]):
+                        results["entities"].append(record["entity"])
+                    
+                    # Keep the best match score per entity
+                    score = record.get("score")
+                    if score is not None:
+                        results["scores"][record["entity"]] = max(score, results["scores"].get(record["entity"], 0.0))
+                
+                if record["relation"] and record["related_entity"]:
+                    relation_text = f"{record['entity']} -> {record['relation']} -> {record['related_entity']}"
+                    results["relations"].append(relation_text)
+        
+        return results
+    
+    def _search_entity(self, session, entity: str, limit: int) -> List[Dict[str, Any]]:
+        """Look up one question entity via the full-text index, or the CONTAINS scan"""
+        if config.KG_FULLTEXT_SEARCH:
+            search = self._fulltext_query(entity)
+            if not search:
+                return []
+            
+            try:
+                # Scored index hits, best first; cost depends on matches, not graph size
+                result = session.run(FULLTEXT_ENTITY_QUERY, index=FULLTEXT_INDEX, search=search, limit=limit)
+                return [record.data() for record in result]
+            except Exception as e:
+                if not config.KG_CONTAINS_FALLBACK:
+                    raise
+                logger.warning(f"Full-text entity search failed, falling back to CONTAINS scan: {e}")
+        
+        result = session.run(CONTAINS_ENTITY_QUERY, entity=entity, limit=limit)
+        return [record.data() for record in result]
+    
+    def _search_entities(self, session, entities: List[str], limit: int) -> List[Dict[str, Any]]:
+        """Look up all question entities in one UNWIND query, at most limit rows in total"""
+        entities = list(dict.fromkeys(entity for entity in entities if entity.strip()))
+        if not entities:
+            return []
+        
+        if config.KG_FULLTEXT_SEARCH:
+            searches = list(dict.fromkeys(filter(None, map(self._fulltext_query, entities))))
+            if not searches:
+                return []
+            
+            try:
+                result = session.run(FULLTEXT_ENTITIES_QUERY, index=FULLTEXT_INDEX, searches=searches, limit=limit)
+                return [record.data() for record in result]
+            except Exception as e:
+                if not config.KG_CONTAINS_FALLBACK:
+                    raise
+                logger.warning(f"Full-text entity search failed, falling back to CONTAINS scan: {e}")
+        
+        result = session.run(CONTAINS_ENTITIES_QUERY, entities=entities, limit=limit)
+        return [record.data() for record in result]
+    
+    @staticmethod
+    def _fulltext_query(entity: str) -> str:
+        """Build a Lucene query matching every word of an entity by prefix or fuzzily"""
+        # Keeping only word characters also strips Lucene operators from the question
+        clauses = []
+        for word in re.findall(r"\w+", entity.lower()):
+            if len(word) < 4:
+                clauses.append(f"{word}*")
+            else:
+                clauses.append(f"({word}* OR {word}~)")
+        return " AND ".join(clauses)
+    
+    def _graph_prompt(self, question: str, graph_results: Dict) -> str:
+        """Build the answer prompt from graph results"""
+        context = f"""
             Question: {question}
             
             Related Entities: {', '.join(graph_results['entities'][:10])}
             
             Relationships: {chr(10).join(graph_results['relations'][:5])}
             """
-            
-            prompt = PromptTemplate(
-                input_variables=["context"],
-                template="""
+        
+        prompt = PromptTemplate(
+            input_variables=["context"],
+            template="""
                 Based on the following knowledge graph information, provide a concise answer:
                 
                 {context}
                 
                 Answer:
                 """
-            )
-            
-            response = self.llm.invoke(prompt.format(context=context))
+        )
+        
+        return prompt.format(context=context)
+    
+    def _generate_answer_from_graph(self, question: str, graph_results: Dict) -> str:
+        """Generate natural language answer from graph results"""
+        try:
+            response = self.llm.invoke(self._graph_prompt(question, graph_results))
             answer = response.content if hasattr(response, 'content') else str(response)
             
             return answer.strip()
@@ -317,6 +567,21 @@ class KGPipeline:
             logger.error(f"Answer generation failed: {e}")
             return "Unable to generate answer from knowledge graph."
     
+    def stream_answer_from_graph(self, question: str, graph_results: Dict) -> Iterator[str]:
+        """Yield answer tokens for already-retrieved graph results"""
+        if not (graph_results["entities"] or graph_results["relations"]):
+            yield NO_GRAPH_RESULTS
+            return
+        
+        try:
+            for chunk in self.llm.stream(self._graph_prompt(question, graph_results)):
+                token = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if token:
+                    yield token
+        except Exception as e:
+            logger.error(f"Answer streaming failed: {e}")
+            yield "Unable to generate answer from knowledge graph."
+    
     def get_graph_stats(self) -> Dict[str, int]:
         """Get statistics about the knowledge graph"""
         try:
@@ -2,8 +2,10 @@
 RAG Pipeline for document processing and retrieval
 """
 import logging
+import queue
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
@@ -11,11 +13,16 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import PGVector
 from langchain.chains import RetrievalQA
 from langchain_community.document_loaders import PyPDFLoader
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
 
 from config.config import config
+from utilis.document_loader import DocumentLoaderWithOCR
+from utilis.embedding_cache import CachedEmbeddings
+from utilis.disk_cache import SQLiteCache
+from utilis.embedding_scheduler import EmbeddingScheduler
+from utilis.bulk_loader import PGVectorBulkLoader
+from utilis import connection_pool
+from utilis.numpy_vector_store import NumpyVectorStore
+from utilis.query_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +38,25 @@ class RAGPipeline:
                 openai_api_key=config.OPENAI_API_KEY
             )
             
+            # Embed batches concurrently within the provider's rate limits; the
+            # client keeps its own retries for server errors and timeouts
+            if config.EMBEDDING_SCHEDULER_ENABLED:
+                self.embeddings = EmbeddingScheduler(
+                    self.embeddings,
+                    batch_size=config.EMBEDDING_BATCH_SIZE,
+                    max_in_flight=config.EMBEDDING_MAX_IN_FLIGHT,
+                    tokens_per_minute=config.EMBEDDING_TPM,
+                    requests_per_minute=config.EMBEDDING_RPM,
+                )
+            
+            # Serve repeated chunks from the on-disk embedding cache
+            if config.EMBEDDING_CACHE_ENABLED:
+                self.embeddings = CachedEmbeddings(
+                    self.embeddings,
+                    model_name=config.EMBEDDING_MODEL,
+                    cache=SQLiteCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_MAX_MB),
+                )
+            
             # Initialize vector store connection
             self.vector_store = None
             self.qa_chain = None
@@ -41,6 +67,34 @@ class RAGPipeline:
                 length_function=len,
             )
             
+            # PDF loader that OCRs only pages with too little extractable text
+            self.document_loader = DocumentLoaderWithOCR(
+                chunk_size=config.CHUNK_SIZE,
+                chunk_overlap=config.CHUNK_OVERLAP,
+                ocr_workers=config.OCR_WORKERS,
+                ocr_pages_per_task=config.OCR_PAGES_PER_TASK,
+                ocr_max_memory_mb=config.OCR_MAX_MEMORY_MB,
+                ocr_dpi=config.OCR_DPI,
+                min_page_chars=config.OCR_MIN_PAGE_CHARS,
+            )
+            
+            # Bulk COPY loader for large inserts into the pgvector tables
+            self.bulk_loader = None
+            if config.BULK_INSERT_ENABLED and config.VECTOR_STORE_BACKEND == "pgvector":
+                self.bulk_loader = PGVectorBulkLoader(
+                    connection_factory=connection_pool.raw_connection,
+                    collection_name="textbook_embeddings",
+                    batch_size=config.BULK_INSERT_BATCH_SIZE,
+                    transaction_size=config.BULK_INSERT_TRANSACTION_SIZE,
+                    method=config.BULK_INSERT_METHOD,
+                )
+            
+            # Question embeddings and retrieval results, reused across retries and repeats.
+            # Retrieval results are dropped whenever documents are added.
+            self.query_embedding_cache = TTLCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+            self.retrieval_cache = TTLCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+            self.documents_version = 0
+            
             # Initialize LLM
             self.llm = ChatOpenAI(
                 model=config.LLM_MODEL,
@@ -55,26 +109,23 @@ class RAGPipeline:
             raise
     
     def initialize_vector_store(self):
-        """Initialize connection to Neon Postgres vector store with connection pooling"""
+        """Initialize the vector store on the shared Neon Postgres connection pool"""
         try:
-            # Add connection arguments for better stability
-            connection_string = config.neon_connection_string
+            if self.vector_store:
+                return True
             
-            # Ensure connection string has proper SSL mode
-            if "sslmode" not in connection_string:
-                connection_string += "?sslmode=require"
-            
-            # Add connection pooling parameters
-            if "?" in connection_string:
-                connection_string += "&connect_timeout=10&keepalives=1&keepalives_idle=30&keepalives_interval=10&keepalives_count=5"
-            else:
-                connection_string += "?connect_timeout=10&keepalives=1&keepalives_idle=30&keepalives_interval=10&keepalives_count=5"
+            # Local memory-mapped store for single-node deployments and CI
+            if config.VECTOR_STORE_BACKEND == "numpy":
+                self.vector_store = NumpyVectorStore(self.embeddings, config.NUMPY_STORE_DIR)
+                logger.info("Vector store initialized (numpy backend)")
+                return True
             
             self.vector_store = PGVector(
-                connection_string=connection_string,
+                connection_string=config.neon_connection_string,
                 embedding_function=self.embeddings,
                 collection_name="textbook_embeddings",
                 pre_delete_collection=False,
+                connection=connection_pool.get_engine(),
             )
             logger.info("Vector store initialized with connection pooling")
             return True
@@ -82,37 +133,17 @@ class RAGPipeline:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
     
-    def extract_text_with_ocr(self, pdf_path: str) -> str:
-        """Extract text from PDF using OCR for scanned documents"""
-        try:
-            images = convert_from_path(pdf_path)
-            text = ""
-            for i, image in enumerate(images):
-                page_text = pytesseract.image_to_string(image)
-                text += f"\n--- Page {i+1} ---\n{page_text}"
-            return text
-        except Exception as e:
-            logger.error(f"OCR extraction failed: {e}")
-            return ""
-    
     def process_document(self, pdf_path: str) -> List[Dict[str, Any]]:
         """Process PDF document and create embeddings"""
         try:
-            # Try standard PDF extraction first
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # If no text extracted, use OCR
-            if not documents or all(len(doc.page_content.strip()) < 50 for doc in documents):
-                logger.info("Using OCR for text extraction")
-                ocr_text = self.extract_text_with_ocr(pdf_path)
-                from langchain.schema import Document
-                documents = [Document(page_content=ocr_text, metadata={"source": pdf_path})]
+            # Extract text per page, sending only low-text pages to OCR
+            documents = self.document_loader.load_pdf_with_ocr(pdf_path)
             
             # Split documents into chunks
             chunks = self.text_splitter.split_documents(documents)
             
-            logger.info(f"Processed {len(chunks)} chunks from document")
+            ocr_pages = sum(1 for doc in documents if doc.metadata.get("extraction_method") == "ocr")
+            logger.info(f"Processed {len(chunks)} chunks from document ({ocr_pages}/{len(documents)} pages via OCR)")
             return chunks
             
         except Exception as e:
@@ -126,6 +157,7 @@ class RAGPipeline:
                 self.initialize_vector_store()
             
             self.vector_store.add_documents(chunks)
+            self._documents_changed()
             logger.info(f"Added {len(chunks)} chunks to vector store")
             return True
             
@@ -133,24 +165,60 @@ class RAGPipeline:
             logger.error(f"Failed to add documents: {e}")
             raise
     
+    def _insert_embeddings(self, texts: List[str], embeddings: List[List[float]],
+                           metadatas: List[dict]):
+        """Insert pre-computed embeddings, via bulk COPY when enabled"""
+        if self.bulk_loader:
+            self.bulk_loader.load(texts, embeddings, metadatas)
+        else:
+            self.vector_store.add_embeddings(
+                texts=texts,
+                embeddings=embeddings,
+                metadatas=metadatas,
+            )
+        self._documents_changed()
+    
+    def _documents_changed(self):
+        """Invalidate cached retrieval results after new documents are indexed"""
+        self.documents_version += 1
+        self.retrieval_cache.clear()
+    
+    def bulk_insert(self, chunks: List[Dict[str, Any]]) -> bool:
+        """Embed chunks and bulk-load them into the vector store tables"""
+        try:
+            # PGVector creates the tables and collection on first connect
+            if not self.vector_store:
+                self.initialize_vector_store()
+            
+            texts = [chunk.page_content for chunk in chunks]
+            embeddings = self.embeddings.embed_documents(texts)
+            self._insert_embeddings(texts, embeddings, [chunk.metadata for chunk in chunks])
+            
+            logger.info(f"Bulk inserted {len(chunks)} chunks into vector store")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Bulk insert failed: {e}")
+            raise
+    
     def create_from_documents(self, chunks: List[Dict[str, Any]]) -> bool:
         """Create vector store from document chunks"""
         try:
-            # Build connection string with proper parameters
-            connection_string = config.neon_connection_string
-            if "sslmode" not in connection_string:
-                connection_string += "?sslmode=require"
-            if "?" in connection_string and "connect_timeout" not in connection_string:
-                connection_string += "&connect_timeout=10&keepalives=1&keepalives_idle=30"
+            if self.bulk_loader:
+                return self.bulk_insert(chunks)
+            
+            if not self.vector_store and config.VECTOR_STORE_BACKEND == "numpy":
+                self.initialize_vector_store()
             
             if not self.vector_store:
                 # Create new vector store from documents
                 self.vector_store = PGVector.from_documents(
                     documents=chunks,
                     embedding=self.embeddings,
-                    connection_string=connection_string,
+                    connection_string=config.neon_connection_string,
                     collection_name="textbook_embeddings",
                     pre_delete_collection=False,
+                    connection=connection_pool.get_engine(),
                 )
                 logger.info(f"Created vector store with {len(chunks)} chunks")
             else:
@@ -158,12 +226,124 @@ class RAGPipeline:
                 self.vector_store.add_documents(chunks)
                 logger.info(f"Added {len(chunks)} chunks to existing vector store")
             
+            self._documents_changed()
+            
             return True
             
         except Exception as e:
             logger.error(f"Failed to create from documents: {e}")
             raise
     
+    def stream_ingest(self, pdf_path: str, batch_size: Optional[int] = None,
+                      queue_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream a PDF through split -> embed -> insert, yielding progress per batch
+        
+        Pages are loaded lazily and each stage runs in its own thread with a
+        bounded queue in between, so memory stays flat and every inserted
+        batch is immediately searchable.
+        """
+        batch_size = batch_size or config.INGEST_BATCH_SIZE
+        queue_size = queue_size or config.INGEST_QUEUE_SIZE
+        
+        if not self.vector_store:
+            self.initialize_vector_store()
+        if not self.qa_chain:
+            self.setup_qa_chain()
+        
+        chunk_queue = queue.Queue(maxsize=queue_size)
+        embed_queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        done = object()
+        
+        def put(q: queue.Queue, item) -> bool:
+            # Block on a full queue but give up once the consumer has stopped
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def split_stage():
+            try:
+                batch = []
+                for page in self.document_loader.lazy_load_pdf_with_ocr(pdf_path):
+                    batch.extend(self.text_splitter.split_documents([page]))
+                    while len(batch) >= batch_size:
+                        if not put(chunk_queue, batch[:batch_size]):
+                            return
+                        batch = batch[batch_size:]
+                if batch:
+                    put(chunk_queue, batch)
+                put(chunk_queue, done)
+            except Exception as e:
+                put(chunk_queue, e)
+        
+        def embed_stage():
+            while not stop.is_set():
+                try:
+                    batch = chunk_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if batch is done or isinstance(batch, Exception):
+                    put(embed_queue, batch)
+                    return
+                try:
+                    texts = [chunk.page_content for chunk in batch]
+                    embeddings = self.embeddings.embed_documents(texts)
+                    if not put(embed_queue, (batch, embeddings)):
+                        return
+                except Exception as e:
+                    put(embed_queue, e)
+                    return
+        
+        workers = [
+            threading.Thread(target=split_stage, name="ingest-split", daemon=True),
+            threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+        
+        total_chunks = 0
+        batches = 0
+        started = time.time()
+        
+        try:
+            while True:
+                item = embed_queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                
+                batch, embeddings = item
+                self._insert_embeddings(
+                    [chunk.page_content for chunk in batch],
+                    embeddings,
+                    [chunk.metadata for chunk in batch],
+                )
+                total_chunks += len(batch)
+                batches += 1
+                
+                yield {
+                    "batch": batches,
+                    "batch_chunks": len(batch),
+                    "total_chunks": total_chunks,
+                    "last_page": batch[-1].metadata.get("page"),
+                    "elapsed": time.time() - started,
+                }
+            
+            logger.info(f"Streamed {total_chunks} chunks in {batches} batches from document")
+            
+        except Exception as e:
+            logger.error(f"Streaming ingest failed: {e}")
+            raise
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+    
     def setup_qa_chain(self):
         """Setup the QA chain for question answering"""
         try:
@@ -174,7 +354,7 @@ class RAGPipeline:
             self.qa_chain = RetrievalQA.from_chain_type(
                 llm=self.llm,
                 chain_type="stuff",
-                retriever=self.vector_store.as_retriever(search_kwargs={"k": 5}),
+                retriever=self.vector_store.as_retriever(search_kwargs={"k": config.TOP_K}),
                 return_source_documents=True,
             )
             
@@ -185,28 +365,51 @@ class RAGPipeline:
             logger.error(f"Failed to setup QA chain: {e}")
             raise
     
-    def query(self, question: str, k: int = 5, max_retries: int = 3) -> Dict[str, Any]:
+    def embed_question(self, question: str) -> List[float]:
+        """Embed a question, reusing the cached vector for repeated questions"""
+        embedding = self.query_embedding_cache.get(question)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(question)
+            self.query_embedding_cache.set(question, embedding)
+        return embedding
+    
+    def retrieve(self, question: str, k: Optional[int] = None) -> List[Any]:
+        """Return the top-k chunks for a question (config.TOP_K by default), served from cache when possible"""
+        if not self.vector_store:
+            raise ValueError("Vector store not initialized. Please upload a document first.")
+        
+        k = k or config.TOP_K
+        key = (question, k)
+        docs = self.retrieval_cache.get(key)
+        if docs is None:
+            docs = self.vector_store.similarity_search_by_vector(self.embed_question(question), k=k)
+            self.retrieval_cache.set(key, docs)
+        return docs
+    
+    def query(self, question: str, k: Optional[int] = None, max_retries: int = 3) -> Dict[str, Any]:
         """Query the RAG system with retry logic"""
         for attempt in range(max_retries):
             try:
                 if not self.vector_store:
                     raise ValueError("Vector store not initialized. Please upload a document first.")
                 
-                # Reinitialize vector store connection if needed
+                # The pool pre-pings on checkout, so a retry only needs a fresh pooled connection
                 if attempt > 0:
                     logger.info(f"Retry attempt {attempt + 1}/{max_retries}")
-                    self.initialize_vector_store()
                 
                 # Setup QA chain if not already done
-                if not self.qa_chain or attempt > 0:
+                if not self.qa_chain:
                     self.setup_qa_chain()
                 
-                # Get response using invoke (not __call__)
-                response = self.qa_chain.invoke({"query": question})
+                # Retrieve with the per-call k, then answer with the chain's combine step
+                docs = self.retrieve(question, k=k)
+                response = self.qa_chain.combine_documents_chain.invoke(
+                    {"input_documents": docs, "question": question}
+                )
                 
                 return {
-                    "answer": response["result"],
-                    "sources": [doc.metadata for doc in response["source_documents"]],
+                    "answer": response["output_text"],
+                    "sources": [doc.metadata for doc in docs],
                     "confidence": "high"
                 }
                 
@@ -218,13 +421,25 @@ class RAGPipeline:
                 import time
                 time.sleep(1)
     
-    def get_relevant_context(self, question: str, k: int = 5) -> List[str]:
+    def stream_answer(self, question: str, docs: List[Any]) -> Iterator[str]:
+        """Yield answer tokens for already-retrieved chunks, using the QA chain's prompt"""
+        if not self.qa_chain:
+            self.setup_qa_chain()
+        
+        prompt = self.qa_chain.combine_documents_chain.llm_chain.prompt
+        context = "\n\n".join(doc.page_content for doc in docs)
+        
+        for chunk in self.llm.stream(prompt.format_prompt(context=context, question=question)):
+            if chunk.content:
+                yield chunk.content
+    
+    def get_relevant_context(self, question: str, k: Optional[int] = None) -> List[str]:
         """Get relevant context chunks for a question"""
         try:
             if not self.vector_store:
                 raise ValueError("Vector store not initialized")
             
-            docs = self.vector_store.similarity_search(question, k=k)
+            docs = self.retrieve(question, k=k)
             return [doc.page_content for doc in docs]
             
         except Exception as e:
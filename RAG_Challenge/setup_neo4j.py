@@ -0,0 +1,76 @@
+"""
+Neo4j setup: constraint and indexes for the knowledge graph
+
+Usage:
+    python setup_neo4j.py             # create missing constraint/indexes (default)
+    python setup_neo4j.py status      # report which constraint/indexes exist
+    python setup_neo4j.py migrate-keys  # merge duplicate entities and set canonical keys
+"""
+import argparse
+
+from neo4j import GraphDatabase
+
+from config.config import config
+from utilis.graph_schema import ensure_schema, migrate_canonical_keys, schema_status, unkeyed_entity_count
+
+def print_status(driver):
+    """Print each expected constraint/index and whether it is present"""
+    print("📋 Knowledge graph schema:")
+    for item in schema_status(driver):
+        if item["present"]:
+            print(f"  ✅ {item['description']} ({item['state']})")
+        else:
+            print(f"  ❌ {item['description']} missing")
+    
+    unkeyed = unkeyed_entity_count(driver)
+    if unkeyed:
+        print(f"  🔑 {unkeyed} entities without a canonical key (run migrate-keys before KG_CANONICAL_KEYS)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Neo4j knowledge graph schema setup")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="setup",
+        choices=["setup", "status", "migrate-keys"],
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    
+    print("🔌 Connecting to Neo4j...")
+    print(f"URI: {config.neo4j_uri}")
+    
+    try:
+        driver = GraphDatabase.driver(config.neo4j_uri, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD))
+        driver.verify_connectivity()
+        
+        print("✅ Connected successfully!")
+        
+        if args.command == "setup":
+            result = ensure_schema(driver)
+            print_status(driver)
+            if result["missing"]:
+                print("\n⚠️ Some schema items could not be created (duplicate Entity names must be merged first)")
+            else:
+                print("\n🎉 Neo4j schema setup complete!")
+        elif args.command == "status":
+            print_status(driver)
+        elif args.command == "migrate-keys":
+            result = migrate_canonical_keys(driver)
+            print(f"🔑 Merged {result['merged']} duplicate entities, keyed {result['keyed']} entities")
+            ensure_schema(driver)
+            print_status(driver)
+            print("\n🎉 Canonical keys ready, KG_CANONICAL_KEYS can be turned on")
+        
+        driver.close()
+    
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("\nTroubleshooting:")
+        print("1. Check NEO4J_URI, NEO4J_USER and NEO4J_PASSWORD in your .env file")
+        print("2. Make sure the Neo4j container is running (docker-compose up -d)")
+
+if __name__ == "__main__":
+    main()
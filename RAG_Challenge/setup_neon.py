@@ -1,7 +1,23 @@
+"""
+Neon Postgres setup: pgvector extension and ANN index lifecycle
+
+Usage:
+    python setup_neon.py                      # enable pgvector (default)
+    python setup_neon.py status               # list vector indexes and sizes
+    python setup_neon.py create-index --type hnsw --m 16 --ef-construction 64
+    python setup_neon.py create-index --type ivfflat --lists 100
+    python setup_neon.py rebuild-index
+    python setup_neon.py drop-index
+"""
+import argparse
+import time
+
 import psycopg2
 from dotenv import load_dotenv
 import os
 
+from config.config import config
+
 load_dotenv()
 
 # Get connection details from .env
@@ -14,17 +30,14 @@ NEON_DB_PORT = os.getenv("NEON_DB_PORT", "5432")
 # Create connection string
 connection_string = f"postgresql://{NEON_DB_USER}:{NEON_DB_PASSWORD}@{NEON_DB_HOST}:{NEON_DB_PORT}/{NEON_DB_NAME}?sslmode=require"
 
-print("🔌 Connecting to Neon Postgres...")
-print(f"Host: {NEON_DB_HOST}")
+EMBEDDING_TABLE = "langchain_pg_embedding"
+INDEX_NAMES = {
+    "hnsw": "langchain_pg_embedding_hnsw_idx",
+    "ivfflat": "langchain_pg_embedding_ivfflat_idx",
+}
 
-try:
-    # Connect to database
-    conn = psycopg2.connect(connection_string)
-    cursor = conn.cursor()
-    
-    print("✅ Connected successfully!")
-    
-    # Enable pgvector extension
+def setup_extension(cursor, conn):
+    """Enable and verify the pgvector extension"""
     print("📦 Installing pgvector extension...")
     cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
     conn.commit()
@@ -39,16 +52,142 @@ try:
         print(f"✅ Verification successful: {result[0]} version {result[1]}")
     else:
         print("⚠️ Warning: Could not verify pgvector installation")
+
+def ensure_fixed_dimensions(cursor, conn):
+    """ANN indexes need a typed vector(n) column; PGVector creates an untyped one"""
+    cursor.execute(
+        """
+        SELECT format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = %s::regclass AND a.attname = 'embedding'
+        """,
+        (EMBEDDING_TABLE,)
+    )
+    column_type = cursor.fetchone()[0]
+    if column_type != "vector":
+        return
+    
+    cursor.execute(f"SELECT vector_dims(embedding) FROM {EMBEDDING_TABLE} LIMIT 1")
+    row = cursor.fetchone()
+    if not row:
+        raise ValueError("No embeddings stored yet; load a document before creating an index")
+    
+    print(f"📐 Fixing embedding column to vector({row[0]})...")
+    cursor.execute(f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({row[0]})")
+    conn.commit()
+
+def index_status(cursor):
+    """Print vector indexes on the embedding table with their sizes"""
+    cursor.execute(
+        """
+        SELECT i.relname, am.amname, pg_size_pretty(pg_relation_size(i.oid)), pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        WHERE x.indrelid = %s::regclass AND am.amname IN ('hnsw', 'ivfflat')
+        """,
+        (EMBEDDING_TABLE,)
+    )
+    rows = cursor.fetchall()
+    
+    cursor.execute(f"SELECT count(*), pg_size_pretty(pg_total_relation_size('{EMBEDDING_TABLE}')) FROM {EMBEDDING_TABLE}")
+    count, table_size = cursor.fetchone()
+    print(f"📊 {EMBEDDING_TABLE}: {count} rows, {table_size} total")
+    
+    if not rows:
+        print("⚠️ No ANN index: similarity_search is a sequential scan")
+    for name, method, size, definition in rows:
+        print(f"✅ {name} ({method}, {size})\n   {definition}")
+
+def create_index(cursor, conn, args):
+    """Create an HNSW or IVFFlat cosine index and report build time and size"""
+    ensure_fixed_dimensions(cursor, conn)
+    
+    name = INDEX_NAMES[args.type]
+    if args.type == "hnsw":
+        options = f"(m = {args.m}, ef_construction = {args.ef_construction})"
+    else:
+        options = f"(lists = {args.lists})"
+    
+    if args.maintenance_work_mem:
+        cursor.execute(f"SET maintenance_work_mem = '{args.maintenance_work_mem}'")
+    
+    print(f"🏗️ Building {args.type} index {name} {options}...")
+    start = time.time()
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {name} ON {EMBEDDING_TABLE} "
+        f"USING {args.type} (embedding vector_cosine_ops) WITH {options}"
+    )
+    conn.commit()
+    elapsed = time.time() - start
     
-    # Close connection
-    cursor.close()
-    conn.close()
+    cursor.execute("SELECT pg_size_pretty(pg_relation_size(%s::regclass))", (name,))
+    print(f"✅ Built {name} in {elapsed:.1f}s, size {cursor.fetchone()[0]}")
+
+def drop_index(cursor, conn, args):
+    """Drop the HNSW or IVFFlat index"""
+    name = INDEX_NAMES[args.type]
+    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    print(f"🗑️ Dropped {name}")
+
+def rebuild_index(cursor, conn, args):
+    """Drop and recreate the index (e.g. to pick up new parameters or after bulk loads)"""
+    drop_index(cursor, conn, args)
+    create_index(cursor, conn, args)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Neon Postgres / pgvector setup and index management")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="setup",
+        choices=["setup", "status", "create-index", "rebuild-index", "drop-index"],
+    )
+    parser.add_argument("--type", choices=["hnsw", "ivfflat"], default=config.VECTOR_INDEX_TYPE)
+    parser.add_argument("--m", type=int, default=config.HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=config.HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--lists", type=int, default=config.IVFFLAT_LISTS)
+    parser.add_argument("--maintenance-work-mem", default=None, help="e.g. 1GB, speeds up index builds")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
     
-    print("\n🎉 Neon Postgres setup complete!")
+    print("🔌 Connecting to Neon Postgres...")
+    print(f"Host: {NEON_DB_HOST}")
     
-except Exception as e:
-    print(f"❌ Error: {e}")
-    print("\nTroubleshooting:")
-    print("1. Check your .env file has correct credentials")
-    print("2. Verify your Neon project is active")
-    print("3. Check your internet connection")
\ No newline at end of file
+    try:
+        # Connect to database
+        conn = psycopg2.connect(connection_string)
+        cursor = conn.cursor()
+        
+        print("✅ Connected successfully!")
+        
+        if args.command == "setup":
+            setup_extension(cursor, conn)
+        elif args.command == "status":
+            index_status(cursor)
+        elif args.command == "create-index":
+            create_index(cursor, conn, args)
+        elif args.command == "rebuild-index":
+            rebuild_index(cursor, conn, args)
+        elif args.command == "drop-index":
+            drop_index(cursor, conn, args)
+        
+        # Close connection
+        cursor.close()
+        conn.close()
+        
+        if args.command == "setup":
+            print("\n🎉 Neon Postgres setup complete!")
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        print("\nTroubleshooting:")
+        print("1. Check your .env file has correct credentials")
+        print("2. Verify your Neon project is active")
+        print("3. Check your internet connection")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from langchain.schema import Document
+from utilis import document_loader
+from utilis.document_loader import DocumentLoaderWithOCR
+
+class FakePyPDFLoader:
+    """PyPDFLoader stand-in for a mixed PDF: two text pages and one scanned page"""
+    def __init__(self, file_path):
+        self.file_path = file_path
+    
+    def load(self):
+        return list(self.lazy_load())
+    
+    def lazy_load(self):
+        for page, text in enumerate(["Text page one. " * 10, "", "Text page three. " * 10]):
+            yield Document(page_content=text, metadata={"source": self.file_path, "page": page})
+
+class BrokenPyPDFLoader(FakePyPDFLoader):
+    """PyPDFLoader stand-in that fails after the first page"""
+    def lazy_load(self):
+        yield Document(page_content="Text page one. " * 10, metadata={"source": self.file_path, "page": 0})
+        raise ValueError("Invalid PDF structure")
+
+def ocr_page_range(file_path, first_page, last_page, dpi, lang):
+    return [(page, f"OCR text of page {page}") for page in range(first_page, last_page + 1)]
+
+def ocr_unavailable(*args, **kwargs):
+    raise RuntimeError("Unable to get page count. Is poppler installed and in PATH?")
+
+try:
+    document_loader.PyPDFLoader = FakePyPDFLoader
+    document_loader.convert_from_path = ocr_unavailable
+    document_loader.pdfinfo_from_path = ocr_unavailable
+    
+    loader = DocumentLoaderWithOCR(ocr_workers=1)
+    for name, pages in [
+        ("load_pdf_with_ocr", loader.load_pdf_with_ocr("mixed.pdf")),
+        ("lazy_load_pdf_with_ocr", list(loader.lazy_load_pdf_with_ocr("mixed.pdf"))),
+    ]:
+        assert [doc.metadata["page"] for doc in pages] == [0, 1, 2], name
+        assert all(doc.metadata["extraction_method"] == "text" for doc in pages), name
+        assert pages[0].page_content.startswith("Text page one"), name
+    
+    print("✅ Mixed PDF keeps its extracted text when OCR is unavailable")
+    
+    document_loader.PyPDFLoader = BrokenPyPDFLoader
+    document_loader.pdfinfo_from_path = lambda file_path: {"Pages": 3}
+    document_loader._ocr_page_range = ocr_page_range
+    
+    pages = list(loader.lazy_load_pdf_with_ocr("broken.pdf"))
+    assert [doc.metadata["page"] for doc in pages] == [0, 1, 2]
+    assert [doc.metadata["extraction_method"] for doc in pages] == ["text", "ocr", "ocr"]
+    assert pages[2].page_content == "OCR text of page 3"
+    
+    print("✅ Lazy loading OCRs the remaining pages when PyPDF fails")
+    
+except Exception as e:
+    print(f"❌ Error: {e}")
+    import traceback
+    traceback.print_exc()
@@ -1,16 +1,26 @@
 from langchain_openai import OpenAIEmbeddings
 from config.config import config
+from utilis.disk_cache import SQLiteCache
+from utilis.embedding_cache import CachedEmbeddings
 
 try:
     embeddings = OpenAIEmbeddings(
         model=config.EMBEDDING_MODEL,
         openai_api_key=config.OPENAI_API_KEY
     )
+    if config.EMBEDDING_CACHE_ENABLED:
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model_name=config.EMBEDDING_MODEL,
+            cache=SQLiteCache(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_MAX_MB),
+        )
     
     test_text = "This is a test"
     result = embeddings.embed_query(test_text)
     
     print(f"✅ Embeddings working! Vector dimension: {len(result)}")
+    if isinstance(embeddings, CachedEmbeddings):
+        print(f"📦 Embedding cache: {embeddings.stats()}")
     
 except Exception as e:
     print(f"❌ Error: {e}")
@@ -0,0 +1,52 @@
+import tempfile
+
+from utilis.numpy_vector_store import NumpyVectorStore
+
+class KeywordEmbeddings:
+    """Deterministic 3-d embeddings: one axis per keyword, so nearest neighbours are known"""
+    AXES = {"alpha": [1.0, 0.0, 0.0], "beta": [0.0, 1.0, 0.0], "gamma": [-1.0, 0.0, 0.0]}
+    
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+    
+    def embed_query(self, text):
+        return self.AXES[text.split()[0]]
+
+try:
+    with tempfile.TemporaryDirectory() as directory:
+        store = NumpyVectorStore(KeywordEmbeddings(), directory)
+        store.add_texts(["alpha page", "beta page"])
+        
+        # Crash after part of a vector was written, before its metadata and header
+        with open(store.vectors_path, "ab") as f:
+            f.write(b"\x00\x00\x80\xbf" * 2)
+        
+        store = NumpyVectorStore(KeywordEmbeddings(), directory)
+        store.add_texts(["gamma page"])
+        
+        hits = store.similarity_search_with_score("gamma", k=3)
+        assert [doc.page_content for doc, _ in hits] == ["gamma page", "beta page", "alpha page"], hits
+        assert abs(hits[0][1]) < 1e-6, hits
+        assert store.vectors_path.stat().st_size == 128 + 3 * 3 * 4
+        print("✅ Append after a crashed vector write keeps vectors aligned")
+        
+        # Crash halfway through a metadata line, after its vector was written
+        with open(store.vectors_path, "ab") as f:
+            f.write(b"\x00\x00\x80\x3f" + b"\x00" * 8)
+        with open(store.metadata_path, "a", encoding="utf-8") as f:
+            f.write('{"id": "cut-off", "text": "alp')
+        
+        store = NumpyVectorStore(KeywordEmbeddings(), directory)
+        assert [doc.page_content for doc in store.similarity_search("alpha", k=5)][0] == "alpha page"
+        store.add_texts(["beta again"])
+        
+        store = NumpyVectorStore(KeywordEmbeddings(), directory)
+        contents = [doc.page_content for doc in store.similarity_search("beta", k=5)]
+        assert sorted(contents[:2]) == ["beta again", "beta page"], contents
+        assert len(contents) == 4, contents
+        print("✅ A truncated metadata line is dropped on load and appends stay aligned")
+
+except Exception as e:
+    print(f"❌ Error: {e}")
+    import traceback
+    traceback.print_exc()
@@ -0,0 +1,172 @@
+"""
+Bulk loader that streams chunks and vectors into PGVector tables with COPY
+"""
+import io
+import json
+import logging
+import struct
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Tables created by langchain_community.vectorstores.PGVector
+COLLECTION_TABLE = "langchain_pg_collection"
+EMBEDDING_TABLE = "langchain_pg_embedding"
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+
+class PGVectorBulkLoader:
+    """Load document chunks and their embeddings into a PGVector collection in bulk"""
+    
+    def __init__(self, connection_factory: Callable[[], Any], collection_name: str,
+                 batch_size: int = 1000, transaction_size: int = 10000,
+                 method: str = "copy"):
+        """Create a loader
+        
+        Args:
+            connection_factory: Returns a psycopg2 connection
+            collection_name: PGVector collection to load into
+            batch_size: Rows per COPY / multi-row INSERT statement
+            transaction_size: Rows per committed transaction
+            method: "copy" (binary COPY FROM STDIN) or "insert" (multi-row INSERT)
+        """
+        if method not in ("copy", "insert"):
+            raise ValueError(f"Unknown bulk load method: {method}")
+        
+        self.connection_factory = connection_factory
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.transaction_size = max(transaction_size, batch_size)
+        self.method = method
+    
+    def _collection_id(self, cursor) -> uuid.UUID:
+        """Look up (or create) the collection row and return its uuid"""
+        cursor.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", (self.collection_name,))
+        row = cursor.fetchone()
+        if row:
+            return uuid.UUID(str(row[0]))
+        
+        collection_id = uuid.uuid4()
+        cursor.execute(
+            f"INSERT INTO {COLLECTION_TABLE} (uuid, name, cmetadata) VALUES (%s, %s, %s)",
+            (str(collection_id), self.collection_name, None)
+        )
+        return collection_id
+    
+    @staticmethod
+    def _metadata_is_jsonb(cursor) -> bool:
+        """Whether cmetadata is jsonb (newer PGVector) rather than json"""
+        cursor.execute(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = 'cmetadata'",
+            (EMBEDDING_TABLE,)
+        )
+        row = cursor.fetchone()
+        return bool(row and row[0] == "jsonb")
+    
+    def load(self, texts: List[str], embeddings: List[List[float]],
+             metadatas: Optional[List[dict]] = None) -> Dict[str, int]:
+        """Insert rows in batches and return row and transaction counts"""
+        metadatas = metadatas or [{} for _ in texts]
+        rows = list(zip(texts, embeddings, metadatas))
+        
+        conn = self.connection_factory()
+        stats = {"rows": 0, "batches": 0, "transactions": 0}
+        
+        try:
+            with conn.cursor() as cursor:
+                collection_id = self._collection_id(cursor)
+                jsonb = self._metadata_is_jsonb(cursor)
+                
+                rows_in_transaction = 0
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    
+                    if self.method == "copy":
+                        self._copy_batch(cursor, collection_id, batch, jsonb)
+                    else:
+                        self._insert_batch(cursor, collection_id, batch)
+                    
+                    stats["rows"] += len(batch)
+                    stats["batches"] += 1
+                    rows_in_transaction += len(batch)
+                    
+                    if rows_in_transaction >= self.transaction_size:
+                        conn.commit()
+                        stats["transactions"] += 1
+                        rows_in_transaction = 0
+                
+                if rows_in_transaction:
+                    conn.commit()
+                    stats["transactions"] += 1
+            
+            logger.info(f"Bulk loaded {stats['rows']} rows in {stats['batches']} batches "
+                        f"({stats['transactions']} transactions, method={self.method})")
+            return stats
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Bulk load failed: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    def _copy_batch(self, cursor, collection_id: uuid.UUID, batch: Iterable, jsonb: bool):
+        """Stream one batch with binary COPY FROM STDIN"""
+        buffer = io.BytesIO()
+        buffer.write(COPY_HEADER)
+        
+        collection_bytes = collection_id.bytes
+        for text, embedding, metadata in batch:
+            metadata_bytes = json.dumps(metadata).encode("utf-8")
+            if jsonb:
+                # jsonb binary format is a version byte followed by the text
+                metadata_bytes = b"\x01" + metadata_bytes
+            
+            fields = [
+                uuid.uuid4().bytes,
+                collection_bytes,
+                # pgvector binary format: int16 dim, int16 unused, float4[dim]
+                struct.pack(f"!hh{len(embedding)}f", len(embedding), 0, *embedding),
+                text.encode("utf-8"),
+                metadata_bytes,
+                str(uuid.uuid1()).encode("utf-8"),
+            ]
+            
+            buffer.write(struct.pack("!h", len(fields)))
+            for field in fields:
+                buffer.write(struct.pack("!i", len(field)))
+                buffer.write(field)
+        
+        buffer.write(COPY_TRAILER)
+        buffer.seek(0)
+        
+        cursor.copy_expert(
+            f"COPY {EMBEDDING_TABLE} (uuid, collection_id, embedding, document, cmetadata, custom_id) "
+            f"FROM STDIN WITH (FORMAT binary)",
+            buffer
+        )
+    
+    def _insert_batch(self, cursor, collection_id: uuid.UUID, batch: Iterable):
+        """Insert one batch with a single multi-row INSERT"""
+        values = [
+            (
+                str(uuid.uuid4()),
+                str(collection_id),
+                "[" + ",".join(map(str, embedding)) + "]",
+                text,
+                json.dumps(metadata),
+                str(uuid.uuid1()),
+            )
+            for text, embedding, metadata in batch
+        ]
+        execute_values(
+            cursor,
+            f"INSERT INTO {EMBEDDING_TABLE} (uuid, collection_id, embedding, document, cmetadata, custom_id) VALUES %s",
+            values,
+            template="(%s, %s, %s::vector, %s, %s, %s)",
+            page_size=len(values),
+        )
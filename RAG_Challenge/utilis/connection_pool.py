@@ -0,0 +1,93 @@
+"""
+Process-wide pooled connections to Neon Postgres
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import sqlalchemy
+
+from config.config import config
+
+logger = logging.getLogger(__name__)
+
+_engine: Optional[sqlalchemy.engine.Engine] = None
+_engine_lock = threading.Lock()
+
+def _set_search_parameters(dbapi_connection, connection_record):
+    """Apply ANN search parameters once per new physical connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET hnsw.ef_search = {int(config.HNSW_EF_SEARCH)}")
+    cursor.execute(f"SET ivfflat.probes = {int(config.IVFFLAT_PROBES)}")
+    cursor.close()
+    dbapi_connection.commit()
+
+def _mark_idle(dbapi_connection, connection_record):
+    """Remember when a connection went back to the pool"""
+    connection_record.info["idle_since"] = time.monotonic()
+
+def _check_idle(dbapi_connection, connection_record, connection_proxy):
+    """Replace a connection that sat idle long enough for Neon to have dropped it
+    
+    Raising DisconnectionError makes the pool discard it and check out a fresh one.
+    """
+    idle_since = connection_record.info.pop("idle_since", None)
+    if idle_since is not None and time.monotonic() - idle_since > config.DB_POOL_IDLE_TIMEOUT:
+        raise sqlalchemy.exc.DisconnectionError("connection idle past DB_POOL_IDLE_TIMEOUT")
+
+def get_engine() -> sqlalchemy.engine.Engine:
+    """Return the shared, bounded SQLAlchemy engine (created on first use)"""
+    global _engine
+    if _engine is not None:
+        return _engine
+    
+    with _engine_lock:
+        if _engine is None:
+            engine = sqlalchemy.create_engine(
+                config.neon_connection_string,
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_POOL_MAX_OVERFLOW,
+                pool_timeout=config.DB_POOL_TIMEOUT,
+                # Replace connections older than this, however recently they were used
+                # (idle connections are handled by _check_idle on checkout)
+                pool_recycle=config.DB_POOL_RECYCLE,
+                # Test each connection on checkout and transparently replace dead ones
+                pool_pre_ping=True,
+            )
+            sqlalchemy.event.listen(engine, "connect", _set_search_parameters)
+            sqlalchemy.event.listen(engine, "checkin", _mark_idle)
+            sqlalchemy.event.listen(engine, "checkout", _check_idle)
+            _engine = engine
+            logger.info(f"Postgres connection pool created (size={config.DB_POOL_SIZE}, "
+                        f"overflow={config.DB_POOL_MAX_OVERFLOW})")
+    
+    return _engine
+
+def raw_connection():
+    """Check out a pooled psycopg2 connection; close() returns it to the pool"""
+    return get_engine().raw_connection()
+
+def health_check() -> bool:
+    """Run a trivial query through the pool"""
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(sqlalchemy.text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Postgres health check failed: {e}")
+        return False
+
+def pool_status() -> Dict[str, int]:
+    """Return current pool usage"""
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+def dispose():
+    """Close every pooled connection (e.g. after a failover)"""
+    if _engine is not None:
+        _engine.dispose()
@@ -0,0 +1,135 @@
+"""
+Persistent SQLite key/value cache with size-based eviction
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCache:
+    """Content-addressed blob cache stored in a local SQLite file"""
+    
+    def __init__(self, path: str, max_size_mb: int = 512):
+        """Open (or create) the cache database"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        
+        self.hits = 0
+        self.misses = 0
+        
+        # One connection shared across threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._conn.commit()
+    
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Return cached values for the keys that are present"""
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        
+        return found
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for a key, or None"""
+        return self.get_many([key]).get(key)
+    
+    def set_many(self, items: Iterable[tuple]):
+        """Store (key, value) pairs and evict least recently used entries if over size"""
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items]
+        if not rows:
+            return
+        
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._evict()
+    
+    def set(self, key: str, value: bytes):
+        """Store a single value"""
+        self.set_many([(key, value)])
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_size_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        
+        excess = total - self.max_size_bytes
+        freed = 0
+        evict_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY last_access"):
+            evict_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", evict_keys)
+        self._conn.commit()
+        logger.info(f"Evicted {len(evict_keys)} cache entries ({freed / 1024 / 1024:.1f}MB) from {self.path}")
+    
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+    
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_mb": size / 1024 / 1024,
+        }
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -1,19 +1,70 @@
 import os
-from typing import List
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Iterator, List, Optional, Tuple
 from langchain.schema import Document
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 from PIL import Image
 import tempfile
 
+
+def _estimate_page_mb(dpi: int) -> float:
+    """Estimate the memory of one rasterized grayscale letter-size page"""
+    return (8.5 * dpi) * (11 * dpi) / (1024 * 1024)
+
+
+def _ocr_page_range(file_path: str, first_page: int, last_page: int,
+                    dpi: int, lang: str) -> List[Tuple[int, str]]:
+    """Rasterize and OCR one window of pages (runs inside a worker process)"""
+    images = convert_from_path(
+        file_path,
+        dpi=dpi,
+        first_page=first_page,
+        last_page=last_page,
+        grayscale=True,
+    )
+    
+    results = []
+    for offset, image in enumerate(images):
+        text = pytesseract.image_to_string(image, lang=lang)
+        results.append((first_page + offset, text))
+        image.close()
+    
+    return results
+
+
+def classify_pages(documents: List[Document], min_chars: int = 50) -> List[int]:
+    """Return indices of pages whose extracted text is too short and needs OCR"""
+    return [
+        index for index, doc in enumerate(documents)
+        if len(doc.page_content.strip()) < min_chars
+    ]
+
+
 class DocumentLoaderWithOCR:
     """Document loader with OCR capabilities for images in PDFs"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 ocr_workers: int = 1, ocr_pages_per_task: int = 4,
+                 ocr_max_memory_mb: int = 1024, ocr_dpi: int = 300,
+                 min_page_chars: int = 50):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        
+        # OCR limits: worker processes, pages rasterized per task and the
+        # memory budget for rasterized pages held across all workers
+        self.ocr_workers = max(1, ocr_workers)
+        self.ocr_pages_per_task = max(1, ocr_pages_per_task)
+        self.ocr_max_memory_mb = ocr_max_memory_mb
+        self.ocr_dpi = ocr_dpi
+        
+        # Pages with less extracted text than this are sent to OCR
+        self.min_page_chars = min_page_chars
+        
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -22,50 +73,100 @@ class DocumentLoaderWithOCR:
         )
     
     def load_pdf_with_ocr(self, file_path: str) -> List[Document]:
-        """Load PDF with OCR support for images"""
-        documents = []
-        
+        """Load PDF with OCR support for images, OCR-ing only low-text pages"""
         try:
             # First, try standard PDF text extraction
             loader = PyPDFLoader(file_path)
             docs = loader.load()
-            
-            # Check if text extraction was successful
-            total_text = "".join([doc.page_content for doc in docs])
-            
-            if len(total_text.strip()) < 100:  # Likely image-based PDF
-                print("📸 Detected image-based PDF. Running OCR...")
-                documents = self._ocr_pdf(file_path)
-            else:
-                documents = docs
-                
         except Exception as e:
             print(f"⚠️ Standard extraction failed: {e}. Trying OCR...")
+            return self._ocr_pdf(file_path)
+        
+        ocr_pages = classify_pages(docs, self.min_page_chars)
+        
+        if docs and len(ocr_pages) == len(docs):
+            print("📸 Detected image-based PDF. Running OCR...")
+        elif ocr_pages:
+            print(f"📸 Running OCR on {len(ocr_pages)} of {len(docs)} low-text pages...")
+        
+        documents = self.ocr_low_text_pages(file_path, docs, ocr_pages)
+        
+        if not documents:
             documents = self._ocr_pdf(file_path)
         
         return documents
     
+    def lazy_load_pdf_with_ocr(self, file_path: str) -> Iterator[Document]:
+        """Yield pages lazily, OCR-ing low-text pages one window at a time"""
+        # Enough pages to keep every OCR worker busy with one task
+        window_size = self.ocr_pages_per_task * self.ocr_workers
+        window = []
+        pages_read = 0
+        errors = []
+        
+        def text_pages() -> Iterator[Document]:
+            # Stop quietly when PyPDF fails; the remaining pages are OCR'd below
+            try:
+                yield from PyPDFLoader(file_path).lazy_load()
+            except Exception as e:
+                errors.append(e)
+        
+        # One process pool serves every window of the document
+        with self._ocr_executor() as executor:
+            for doc in text_pages():
+                window.append(doc)
+                pages_read += 1
+                if len(window) >= window_size:
+                    yield from self._ocr_window(file_path, window, executor)
+                    window = []
+            
+            if window:
+                yield from self._ocr_window(file_path, window, executor)
+            
+            if errors:
+                print(f"⚠️ Standard extraction failed: {errors[0]}. OCR-ing from page {pages_read + 1}...")
+                yield from self.iter_ocr_pdf(file_path, first_page=pages_read + 1, executor=executor)
+    
+    def _ocr_executor(self):
+        """Process pool for OCR (a no-op context with a single worker)"""
+        if self.ocr_workers == 1:
+            return nullcontext()
+        return ProcessPoolExecutor(max_workers=self.ocr_workers)
+    
+    def _ocr_window(self, file_path: str, docs: List[Document],
+                    executor: Optional[Executor] = None) -> List[Document]:
+        """Run the low-text page classifier and OCR over one window of pages"""
+        ocr_pages = classify_pages(docs, self.min_page_chars)
+        return self.ocr_low_text_pages(file_path, docs, ocr_pages, executor)
+    
+    def ocr_low_text_pages(self, file_path: str, docs: List[Document],
+                           ocr_pages: List[int], executor: Optional[Executor] = None) -> List[Document]:
+        """Replace the given low-text pages with their OCR text, keeping the rest"""
+        documents = []
+        for doc in docs:
+            metadata = dict(doc.metadata, extraction_method="text")
+            documents.append(Document(page_content=doc.page_content, metadata=metadata))
+        
+        if not ocr_pages:
+            return documents
+        
+        # Pages whose OCR fails keep their extracted text
+        by_page = {docs[i].metadata.get("page", i): i for i in ocr_pages}
+        ocr_docs = self.iter_ocr_pages(file_path, [page + 1 for page in by_page],
+                                       executor, skip_failed=True)
+        for ocr_doc in ocr_docs:
+            index = by_page[ocr_doc.metadata["page"]]
+            documents[index].page_content = ocr_doc.page_content
+            documents[index].metadata["extraction_method"] = "ocr"
+        
+        return documents
+    
     def _ocr_pdf(self, file_path: str) -> List[Document]:
         """Perform OCR on PDF pages"""
         documents = []
         
         try:
-            # Convert PDF to images
-            images = convert_from_path(file_path, dpi=300)
-            
-            for page_num, image in enumerate(images, start=1):
-                # Perform OCR
-                text = pytesseract.image_to_string(image, lang='eng')
-                
-                # Create document
-                doc = Document(
-                    page_content=text,
-                    metadata={
-                        "source": file_path,
-                        "page": page_num,
-                        "extraction_method": "ocr"
-                    }
-                )
+            for doc in self.iter_ocr_pdf(file_path):
                 documents.append(doc)
                 
             print(f"✅ OCR completed for {len(documents)} pages")
@@ -76,6 +177,99 @@ class DocumentLoaderWithOCR:
         
         return documents
     
+    def _max_windows_in_flight(self) -> int:
+        """Number of page windows that fit in the OCR memory budget"""
+        window_mb = _estimate_page_mb(self.ocr_dpi) * self.ocr_pages_per_task
+        return max(1, int(self.ocr_max_memory_mb // window_mb))
+    
+    def iter_ocr_pdf(self, file_path: str, first_page: int = 1, last_page: int = None,
+                     executor: Optional[Executor] = None) -> Iterator[Document]:
+        """OCR a page range on a process pool and yield Documents in page order"""
+        if last_page is None:
+            last_page = pdfinfo_from_path(file_path)["Pages"]
+        
+        yield from self.iter_ocr_pages(file_path, range(first_page, last_page + 1), executor)
+    
+    def iter_ocr_pages(self, file_path: str, page_numbers,
+                       executor: Optional[Executor] = None,
+                       skip_failed: bool = False) -> Iterator[Document]:
+        """OCR the given 1-based page numbers and yield Documents in page order
+        
+        Documents use PyPDFLoader's 0-based "page" metadata, so a page has the
+        same number whether it was extracted as text or OCR'd. Pass an executor
+        to reuse one process pool across calls; otherwise a pool is started for
+        this call. With skip_failed, windows whose OCR fails are logged and
+        left out instead of raising.
+        """
+        windows = self._page_windows(sorted(set(page_numbers)))
+        
+        def to_documents(pages: List[Tuple[int, str]]) -> Iterator[Document]:
+            for page_num, text in pages:
+                yield Document(
+                    page_content=text,
+                    metadata={
+                        "source": file_path,
+                        "page": page_num - 1,
+                        "extraction_method": "ocr"
+                    }
+                )
+        
+        def window_failed(start: int, end: int, error: Exception):
+            if not skip_failed:
+                raise error
+            print(f"⚠️ OCR failed for pages {start}-{end}, keeping extracted text: {error}")
+        
+        # Single worker: rasterize window by window in this process
+        if self.ocr_workers == 1:
+            for start, end in windows:
+                try:
+                    pages = _ocr_page_range(file_path, start, end, self.ocr_dpi, 'eng')
+                except Exception as e:
+                    window_failed(start, end, e)
+                    continue
+                yield from to_documents(pages)
+            return
+        
+        # Keep at most max_in_flight windows submitted so rasterized pages
+        # never exceed the memory budget, and pop futures in submission order
+        max_in_flight = self._max_windows_in_flight()
+        pending_windows = deque(windows)
+        
+        with nullcontext(executor) if executor else self._ocr_executor() as executor:
+            in_flight = deque()
+            
+            def submit_next():
+                start, end = pending_windows.popleft()
+                in_flight.append((start, end, executor.submit(
+                    _ocr_page_range, file_path, start, end, self.ocr_dpi, 'eng'
+                )))
+            
+            while pending_windows and len(in_flight) < max_in_flight:
+                submit_next()
+            
+            while in_flight:
+                start, end, future = in_flight.popleft()
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    window_failed(start, end, e)
+                    pages = []
+                if pending_windows:
+                    submit_next()
+                yield from to_documents(pages)
+    
+    def _page_windows(self, page_numbers: List[int]) -> List[Tuple[int, int]]:
+        """Group sorted page numbers into contiguous windows of at most ocr_pages_per_task"""
+        windows = []
+        for page_num in page_numbers:
+            if windows:
+                start, end = windows[-1]
+                if page_num == end + 1 and end - start + 1 < self.ocr_pages_per_task:
+                    windows[-1] = (start, page_num)
+                    continue
+            windows.append((page_num, page_num))
+        return windows
+    
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """Split documents into chunks"""
         return self.text_splitter.split_documents(documents)
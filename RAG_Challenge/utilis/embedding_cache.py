@@ -0,0 +1,67 @@
+"""
+Content-addressed on-disk cache for embedding models
+"""
+import hashlib
+import logging
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from utilis.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from a persistent cache"""
+    
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: SQLiteCache):
+        """Wrap an embeddings model with a cache keyed by hash(model name + text)"""
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+    
+    def _key(self, text: str) -> str:
+        """Cache key for a text under the wrapped model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, calling the wrapped model only for cache misses"""
+        keys = [self._key(text) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        
+        vectors: Dict[str, List[float]] = {
+            key: array("f", value).tolist() for key, value in cached.items()
+        }
+        
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.set_many(
+                (key, array("f", vector).tobytes())
+                for key, vector in zip(missing.keys(), new_vectors)
+            )
+            vectors.update(zip(missing.keys(), new_vectors))
+            logger.debug(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        
+        return [vectors[key] for key in keys]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query text through the cache"""
+        key = self._key(text)
+        value = self.cache.get(key)
+        if value is not None:
+            return array("f", value).tolist()
+        
+        vector = self.embeddings.embed_query(text)
+        self.cache.set(key, array("f", vector).tobytes())
+        return vector
+    
+    def stats(self) -> Dict[str, float]:
+        """Return cache hit/miss counters"""
+        return self.cache.stats()
@@ -0,0 +1,139 @@
+"""
+Concurrent, rate-limit-aware batch scheduler for embedding models
+"""
+import asyncio
+import logging
+import random
+import threading
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from utilis.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an exception is a provider 429 / rate limit response"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+class EmbeddingScheduler(Embeddings):
+    """Embeddings wrapper that sends batches concurrently under request and token budgets
+    
+    In-flight requests are capped by an adaptive limit: every 429 halves it
+    and backs off exponentially, every success grows it back by one.
+    """
+    
+    def __init__(self, embeddings: Embeddings, batch_size: int = 256,
+                 max_in_flight: int = 8, tokens_per_minute: int = 1_000_000,
+                 requests_per_minute: int = 3000, max_retries: int = 6):
+        """Wrap an embeddings model that implements aembed_documents"""
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0}
+    
+    @staticmethod
+    def _estimate_tokens(texts: List[str]) -> int:
+        """Cheap token estimate (~4 characters per token)"""
+        return sum(len(text) for text in texts) // 4 + len(texts)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts as concurrent batches, preserving input order"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return []
+        
+        limit = {"current": self.max_in_flight, "in_flight": 0}
+        slot_free = asyncio.Condition()
+        
+        async def acquire_slot():
+            async with slot_free:
+                await slot_free.wait_for(lambda: limit["in_flight"] < limit["current"])
+                limit["in_flight"] += 1
+        
+        async def release_slot(rate_limited: bool):
+            async with slot_free:
+                limit["in_flight"] -= 1
+                if rate_limited:
+                    limit["current"] = max(1, limit["current"] // 2)
+                else:
+                    limit["current"] = min(self.max_in_flight, limit["current"] + 1)
+                slot_free.notify_all()
+        
+        async def run_batch(batch: List[str]) -> List[List[float]]:
+            for attempt in range(self.max_retries + 1):
+                await self.request_bucket.aacquire(1)
+                await self.token_bucket.aacquire(self._estimate_tokens(batch))
+                await acquire_slot()
+                
+                try:
+                    self.stats["requests"] += 1
+                    vectors = await self.embeddings.aembed_documents(batch)
+                except Exception as e:
+                    rate_limited = is_rate_limit_error(e)
+                    await release_slot(rate_limited)
+                    if not rate_limited or attempt == self.max_retries:
+                        raise
+                    
+                    self.stats["rate_limited"] += 1
+                    self.stats["retries"] += 1
+                    delay = min(60.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                    logger.warning(f"Embedding batch rate limited, retrying in {delay:.1f}s "
+                                   f"(in-flight limit {limit['current']})")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                await release_slot(False)
+                return vectors
+        
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Synchronous entry point used by vector stores"""
+        return _run_coroutine(self.aembed_documents(texts))
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are single requests; delegate directly"""
+        return self.embeddings.embed_query(text)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async single query embedding"""
+        return await self.embeddings.aembed_query(text)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Return request, rate-limit and retry counters"""
+        return dict(self.stats)
+
+
+def _run_coroutine(coro):
+    """Run a coroutine to completion, even if called from inside a running loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    # Already inside an event loop: run on a helper thread with its own loop
+    result = {}
+    
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+    
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
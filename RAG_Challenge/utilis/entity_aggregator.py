@@ -0,0 +1,135 @@
+"""
+Entity canonicalization and aggregation before knowledge graph writes
+"""
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+STRIP_CHARS = " \t\n.,;:!?\"'()[]{}"
+
+def normalize_entity(name: str) -> str:
+    """Clean an entity surface form: collapse whitespace, trim punctuation, drop 'the' and "'s" """
+    name = " ".join(str(name).split()).strip(STRIP_CHARS)
+    if name.lower().startswith("the "):
+        name = name[4:]
+    if name.endswith("'s") or name.endswith("’s"):
+        name = name[:-2]
+    return name.strip(STRIP_CHARS)
+
+def canonical_key(name: str) -> str:
+    """Key an entity is deduplicated under, here and as Entity.canonical_key in the graph"""
+    return normalize_entity(name).casefold()
+
+
+class EntityAggregator:
+    """Collapse duplicate entities and relations, counting mentions and types
+    
+    Canonical display names are remembered across drains, so "India" written
+    in one batch is not written as "INDIA" in a later one.
+    """
+    
+    def __init__(self):
+        self._entities: Dict[str, Dict[str, Any]] = {}
+        self._relations: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._canonical: Dict[str, str] = {}
+        self.raw_entities = 0
+        self.raw_relations = 0
+        
+        # Cumulative mentions seen vs. distinct rows handed to the writer
+        self.stats = {"entity_mentions": 0, "entities": 0, "relation_mentions": 0, "relations": 0}
+    
+    @property
+    def entity_count(self) -> int:
+        """Distinct entities waiting to be written"""
+        return len(self._entities)
+    
+    def _add_surface(self, key: str, surface: str, mentions: int):
+        """Count a surface form (and mentions) for an entity key"""
+        entry = self._entities.setdefault(key, {"surfaces": Counter(), "types": Counter(), "mentions": 0})
+        entry["surfaces"][surface] += mentions
+        entry["mentions"] += mentions
+        return entry
+    
+    def add_entities(self, entities: List[Dict]):
+        """Add spaCy entities ({"text", "label"}, optionally pre-aggregated "mentions")"""
+        for entity in entities:
+            surface = normalize_entity(entity.get("text", ""))
+            if not surface:
+                continue
+            mentions = entity.get("mentions", 1)
+            self.raw_entities += mentions
+            entry = self._add_surface(canonical_key(surface), surface, mentions)
+            if entity.get("label"):
+                entry["types"][entity["label"]] += mentions
+            
+            # Keep other types of an already-aggregated entity, ranked below its label
+            for label in entity.get("types", []):
+                entry["types"][label] += 0
+    
+    def add_relations(self, relations: List[Dict]):
+        """Add relations ({"subject", "relation", "object"}, optionally "mentions")"""
+        for relation in relations:
+            subject = normalize_entity(relation.get("subject", ""))
+            obj = normalize_entity(relation.get("object", ""))
+            predicate = " ".join(str(relation.get("relation", "")).split())
+            if not (subject and obj and predicate):
+                continue
+            
+            mentions = relation.get("mentions", 1)
+            self.raw_relations += mentions
+            key = (canonical_key(subject), predicate.casefold(), canonical_key(obj))
+            entry = self._relations.setdefault(key, {"surfaces": (subject, predicate, obj), "mentions": 0})
+            entry["mentions"] += mentions
+    
+    def _display_name(self, key: str, surfaces: Counter) -> str:
+        """Pick (once) the name an entity is written under"""
+        if key not in self._canonical:
+            # Most frequent surface form; on ties prefer mixed case over ALL CAPS / lowercase
+            self._canonical[key] = max(
+                surfaces, key=lambda surface: (surfaces[surface], not surface.isupper(), not surface.islower())
+            )
+        return self._canonical[key]
+    
+    def drain(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return the distinct entities and relations collected so far and reset the buffers"""
+        entities = []
+        for key, entry in self._entities.items():
+            types = [label for label, _ in entry["types"].most_common()]
+            entities.append({
+                "key": key,
+                "text": self._display_name(key, entry["surfaces"]),
+                "label": types[0] if types else None,
+                "types": types,
+                "mentions": entry["mentions"],
+            })
+        
+        relations = []
+        for (subject_key, _, object_key), entry in self._relations.items():
+            subject, predicate, obj = entry["surfaces"]
+            relations.append({
+                "subject_key": subject_key,
+                "subject": self._canonical.setdefault(subject_key, subject),
+                "relation": predicate,
+                "object_key": object_key,
+                "object": self._canonical.setdefault(object_key, obj),
+                "mentions": entry["mentions"],
+            })
+        
+        self.stats["entity_mentions"] += self.raw_entities
+        self.stats["entities"] += len(entities)
+        self.stats["relation_mentions"] += self.raw_relations
+        self.stats["relations"] += len(relations)
+        
+        if self.raw_entities or self.raw_relations:
+            logger.debug(
+                f"Aggregated {self.raw_entities} entity mentions into {len(entities)} entities and "
+                f"{self.raw_relations} relation mentions into {len(relations)} relations"
+            )
+        
+        self._entities = {}
+        self._relations = {}
+        self.raw_entities = 0
+        self.raw_relations = 0
+        return entities, relations
@@ -0,0 +1,48 @@
+"""
+Content-addressed on-disk cache for entity and relation extraction results
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List
+
+from utilis.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """Cache of {"entities", "relations"} per chunk, keyed by hash(model + prompt version + text)"""
+    
+    def __init__(self, cache: SQLiteCache, model_name: str, prompt_version: str):
+        """Results from a different model or prompt version never match"""
+        self.cache = cache
+        self.model_name = model_name
+        self.prompt_version = prompt_version
+    
+    def _key(self, text: str) -> str:
+        """Cache key for a chunk under the current model and prompt"""
+        return hashlib.sha256(
+            f"{self.model_name}\0{self.prompt_version}\0{text}".encode("utf-8")
+        ).hexdigest()
+    
+    def get_many(self, texts: List[str]) -> Dict[int, Dict[str, Any]]:
+        """Return cached results by index for the texts that are present"""
+        keys = [self._key(text) for text in texts]
+        found = self.cache.get_many(list(set(keys)))
+        return {
+            index: json.loads(found[key])
+            for index, key in enumerate(keys) if key in found
+        }
+    
+    def get(self, text: str) -> Any:
+        """Return the cached result for one text, or None"""
+        return self.get_many([text]).get(0)
+    
+    def set(self, text: str, result: Dict[str, Any]):
+        """Store the entities and relations extracted from a text"""
+        value = json.dumps({"entities": result["entities"], "relations": result["relations"]})
+        self.cache.set(self._key(text), value.encode("utf-8"))
+    
+    def stats(self) -> Dict[str, float]:
+        """Return cache hit/miss counters and size"""
+        return self.cache.stats()
@@ -0,0 +1,217 @@
+"""
+Neo4j schema bootstrap: Entity constraint and indexes used by MERGE and graph lookups
+"""
+import logging
+from typing import Any, Dict, List
+
+from utilis.entity_aggregator import canonical_key
+
+logger = logging.getLogger(__name__)
+
+# Full-text index used by KGPipeline.retrieve_graph for fuzzy/prefix entity lookups
+FULLTEXT_INDEX = "entity_name_fulltext"
+
+# Each entry is satisfied by any online constraint/index on the same label and property,
+# whatever its name, so schemas created by hand are recognised too
+SCHEMA = [
+    {
+        "name": "entity_name_unique",
+        "kind": "constraint",
+        "entity": "Entity",
+        "property": "name",
+        "description": "uniqueness constraint on Entity.name",
+        "create": "CREATE CONSTRAINT entity_name_unique IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
+    },
+    {
+        "name": "entity_canonical_key_unique",
+        "kind": "constraint",
+        "entity": "Entity",
+        "property": "canonical_key",
+        "description": "uniqueness constraint on Entity.canonical_key",
+        "create": (
+            "CREATE CONSTRAINT entity_canonical_key_unique IF NOT EXISTS "
+            "FOR (e:Entity) REQUIRE e.canonical_key IS UNIQUE"
+        ),
+    },
+    {
+        "name": "entity_type_index",
+        "kind": "index",
+        "entity": "Entity",
+        "property": "type",
+        "description": "index on Entity.type",
+        "create": "CREATE INDEX entity_type_index IF NOT EXISTS FOR (e:Entity) ON (e.type)",
+    },
+    {
+        "name": "relates_type_index",
+        "kind": "index",
+        "entity": "RELATES",
+        "property": "type",
+        "description": "relationship index on RELATES.type",
+        "create": "CREATE INDEX relates_type_index IF NOT EXISTS FOR ()-[r:RELATES]-() ON (r.type)",
+    },
+    {
+        "name": FULLTEXT_INDEX,
+        "kind": "fulltext",
+        "entity": "Entity",
+        "property": "name",
+        "description": "full-text index on Entity.name",
+        "create": f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (e:Entity) ON EACH [e.name]",
+    },
+]
+
+def _existing_schema(session) -> Dict[str, set]:
+    """(label, property) pairs covered by uniqueness constraints and range indexes, plus full-text index names"""
+    constraints = set()
+    for record in session.run("SHOW CONSTRAINTS YIELD type, labelsOrTypes, properties"):
+        if "UNIQUE" in record["type"] and record["labelsOrTypes"] and len(record["properties"] or []) == 1:
+            constraints.add((record["labelsOrTypes"][0], record["properties"][0]))
+    
+    indexes = set()
+    fulltext = set()
+    for record in session.run("SHOW INDEXES YIELD name, type, labelsOrTypes, properties, state"):
+        if record["type"] == "RANGE" and record["labelsOrTypes"] and len(record["properties"] or []) == 1:
+            indexes.add((record["labelsOrTypes"][0], record["properties"][0], record["state"]))
+        elif record["type"] == "FULLTEXT":
+            # queryNodes is called by index name, so full-text indexes are matched by name
+            fulltext.add((record["name"], record["state"]))
+    
+    return {"constraints": constraints, "indexes": indexes, "fulltext": fulltext}
+
+def schema_status(driver) -> List[Dict[str, Any]]:
+    """Report whether each expected constraint/index exists and is online"""
+    with driver.session() as session:
+        existing = _existing_schema(session)
+    
+    status = []
+    for item in SCHEMA:
+        key = (item["entity"], item["property"])
+        if item["kind"] == "constraint":
+            present = key in existing["constraints"]
+            state = "ONLINE" if present else None
+        elif item["kind"] == "fulltext":
+            states = [state for name, state in existing["fulltext"] if name == item["name"]]
+            present = bool(states)
+            state = states[0] if states else None
+        else:
+            states = [state for label, prop, state in existing["indexes"] if (label, prop) == key]
+            present = bool(states)
+            state = "ONLINE" if "ONLINE" in states else (states[0] if states else None)
+        
+        status.append({
+            "name": item["name"],
+            "description": item["description"],
+            "present": present,
+            "state": state,
+        })
+    
+    return status
+
+# Folds a duplicate node into the one that keeps its canonical key: RELATES edges are
+# moved (mentions added up, self-loops kept on the survivor), then mentions and types
+MERGE_DUPLICATE_QUERY = """
+MATCH (w:Entity {name: $winner}), (l:Entity {name: $loser})
+CALL {
+    WITH w, l
+    MATCH (l)-[r:RELATES]->(o)
+    WITH w, l, r, CASE WHEN o = l THEN w ELSE o END AS target
+    MERGE (w)-[m:RELATES {type: coalesce(r.type, type(r))}]->(target)
+    ON CREATE SET m.mentions = r.mentions, m.created = r.created
+    ON MATCH SET m.mentions = coalesce(m.mentions, 0) + coalesce(r.mentions, 0)
+    RETURN count(*) AS outgoing
+}
+CALL {
+    WITH w, l
+    MATCH (s)-[r:RELATES]->(l)
+    WHERE s <> l
+    MERGE (s)-[m:RELATES {type: coalesce(r.type, type(r))}]->(w)
+    ON CREATE SET m.mentions = r.mentions, m.created = r.created
+    ON MATCH SET m.mentions = coalesce(m.mentions, 0) + coalesce(r.mentions, 0)
+    RETURN count(*) AS incoming
+}
+SET w.mentions = coalesce(w.mentions, 0) + coalesce(l.mentions, 0),
+    w.types = coalesce(w.types, []) + [t IN coalesce(l.types, []) WHERE NOT t IN coalesce(w.types, [])]
+DETACH DELETE l
+"""
+
+def unkeyed_entity_count(driver) -> int:
+    """Number of Entity nodes without a canonical_key"""
+    with driver.session() as session:
+        return session.run("MATCH (e:Entity) WHERE e.canonical_key IS NULL RETURN count(e) AS n").single()["n"]
+
+def migrate_canonical_keys(driver, batch_size: int = 1000) -> Dict[str, int]:
+    """Merge Entity nodes that share a canonical key and key every node
+    
+    Run once (python setup_neo4j.py migrate-keys) before turning on
+    KG_CANONICAL_KEYS, and again after any writes made with it off. In each
+    group ("India", "INDIA") the most mentioned node survives and the others
+    are folded into it.
+    """
+    with driver.session() as session:
+        nodes = session.run(
+            "MATCH (e:Entity) RETURN e.name AS name, e.canonical_key AS key, "
+            "coalesce(e.mentions, 0) AS mentions"
+        ).data()
+    
+    groups = {}
+    for node in nodes:
+        key = canonical_key(node["name"] or "")
+        if key:
+            groups.setdefault(key, []).append(node)
+    
+    merged = 0
+    survivors = []
+    with driver.session() as session:
+        for key, group in groups.items():
+            group.sort(key=lambda node: node["mentions"], reverse=True)
+            winner, losers = group[0], group[1:]
+            for loser in losers:
+                session.execute_write(
+                    lambda tx, loser=loser: tx.run(
+                        MERGE_DUPLICATE_QUERY, winner=winner["name"], loser=loser["name"]
+                    ).consume()
+                )
+                merged += 1
+            if winner["key"] != key:
+                survivors.append({"name": winner["name"], "key": key})
+        
+        # Clear stale keys first, so re-keying one node never collides with another
+        for start in range(0, len(survivors), batch_size):
+            session.run(
+                "UNWIND $rows AS row MATCH (e:Entity {name: row.name}) REMOVE e.canonical_key",
+                rows=survivors[start:start + batch_size],
+            ).consume()
+        for start in range(0, len(survivors), batch_size):
+            session.run(
+                "UNWIND $rows AS row MATCH (e:Entity {name: row.name}) SET e.canonical_key = row.key",
+                rows=survivors[start:start + batch_size],
+            ).consume()
+    
+    logger.info(f"🔑 Merged {merged} duplicate entities and keyed {len(survivors)} entities")
+    return {"merged": merged, "keyed": len(survivors)}
+
+def ensure_schema(driver) -> Dict[str, List[str]]:
+    """Create missing constraints/indexes; return what was created and what is still missing"""
+    created = []
+    missing = []
+    
+    for item in schema_status(driver):
+        if item["present"]:
+            continue
+        
+        definition = next(entry for entry in SCHEMA if entry["name"] == item["name"])
+        logger.warning(f"⚠️ Missing {item['description']}, creating {item['name']}...")
+        try:
+            with driver.session() as session:
+                session.run(definition["create"]).consume()
+            created.append(item["name"])
+        except Exception as e:
+            # Typically duplicate Entity names written before the constraint existed
+            logger.error(f"Could not create {item['name']}: {e}")
+            missing.append(item["name"])
+    
+    if created:
+        logger.info(f"✅ Created graph schema: {', '.join(created)}")
+    if missing:
+        logger.warning(f"⚠️ Graph schema incomplete, MERGE and lookups will scan: {', '.join(missing)}")
+    
+    return {"created": created, "missing": missing}
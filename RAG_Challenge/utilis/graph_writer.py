@@ -0,0 +1,169 @@
+"""
+Batched Neo4j writer for knowledge graph entities and relations
+"""
+import logging
+from typing import Any, Dict, List
+
+from utilis.entity_aggregator import EntityAggregator, canonical_key
+
+logger = logging.getLogger(__name__)
+
+# Nodes merge on their exact name, or with canonical keys on canonical_key, so "INDIA"
+# in a later document resolves to the "India" node already in the graph (the name a
+# node was created with is kept). Canonical keys need existing nodes keyed and their
+# duplicates merged first: python setup_neo4j.py migrate-keys
+MERGE_PROPERTIES = {
+    False: {"entity": "name: row.name", "subject": "name: row.subject", "object": "name: row.object"},
+    True: {
+        "entity": "canonical_key: row.key",
+        "subject": "canonical_key: row.subject_key",
+        "object": "canonical_key: row.object_key",
+    },
+}
+
+ENTITY_MERGE = """
+MERGE (e:Entity {%(entity)s})
+ON CREATE SET e.name = row.name, e.type = row.type, e.types = row.types, e.mentions = row.mentions,
+              e.created = timestamp()
+ON MATCH SET e.type = row.type,
+             e.types = coalesce(e.types, []) + [t IN row.types WHERE NOT t IN coalesce(e.types, [])],
+             e.mentions = coalesce(e.mentions, 0) + row.mentions,
+             e.updated = timestamp()
+"""
+
+RELATION_MERGE = """
+MERGE (s:Entity {%(subject)s})
+ON CREATE SET s.name = row.subject
+MERGE (o:Entity {%(object)s})
+ON CREATE SET o.name = row.object
+MERGE (s)-[r:RELATES {type: row.relation}]->(o)
+ON CREATE SET r.mentions = row.mentions, r.created = timestamp()
+ON MATCH SET r.mentions = coalesce(r.mentions, 0) + row.mentions, r.updated = timestamp()
+"""
+
+def merge_queries(canonical_keys: bool = False) -> Dict[str, str]:
+    """Entity and relation MERGE queries: batches UNWIND $rows, per-row writes bind one $row"""
+    properties = MERGE_PROPERTIES[canonical_keys]
+    entity_merge = ENTITY_MERGE % properties
+    relation_merge = RELATION_MERGE % properties
+    return {
+        "entity_batch": "UNWIND $rows AS row" + entity_merge,
+        "relation_batch": "UNWIND $rows AS row" + relation_merge,
+        "entity_row": "WITH $row AS row" + entity_merge + "RETURN e",
+        "relation_row": "WITH $row AS row" + relation_merge + "RETURN r",
+    }
+
+class GraphWriter:
+    """Write entities and relations to Neo4j as UNWIND batches in explicit write transactions"""
+    
+    def __init__(self, driver, batch_size: int = 1000, canonical_keys: bool = False):
+        """Create a writer over a Neo4j driver, sending at most batch_size rows per transaction"""
+        self.driver = driver
+        self.batch_size = max(1, batch_size)
+        self.queries = merge_queries(canonical_keys)
+    
+    @staticmethod
+    def rows(entities: List[Dict], relations: List[Dict]):
+        """Distinct entity and relation parameter rows with mention counts
+        
+        Input may be raw spaCy/LLM output or already aggregated by EntityAggregator.
+        """
+        aggregator = EntityAggregator()
+        aggregator.add_entities(entities)
+        aggregator.add_relations(relations)
+        entities, relations = aggregator.drain()
+        
+        entity_rows = [
+            {"key": e["key"], "name": e["text"], "type": e["label"], "types": e["types"], "mentions": e["mentions"]}
+            for e in entities
+        ]
+        relation_rows = [
+            {"subject_key": r["subject_key"], "subject": r["subject"], "relation": r["relation"],
+             "object_key": r["object_key"], "object": r["object"], "mentions": r["mentions"]}
+            for r in relations
+        ]
+        return entity_rows, relation_rows
+    
+    def write(self, entities: List[Dict], relations: List[Dict]) -> List[Dict[str, Any]]:
+        """Write entities, then relations, and return created/updated counts per batch"""
+        batches = []
+        entity_rows, relation_rows = self.rows(entities, relations)
+        
+        with self.driver.session() as session:
+            for kind, query, rows in (
+                ("entities", self.queries["entity_batch"], entity_rows),
+                ("relations", self.queries["relation_batch"], relation_rows),
+            ):
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    try:
+                        counters = session.execute_write(self._run_batch, query, batch)
+                    except Exception as e:
+                        # One bad batch should not lose the rest of the document
+                        logger.error(f"Failed to write {kind} batch of {len(batch)}: {e}")
+                        batches.append({"kind": kind, "rows": len(batch), "failed": True})
+                        continue
+                    
+                    created = counters.nodes_created if kind == "entities" else counters.relationships_created
+                    batches.append({
+                        "kind": kind,
+                        "rows": len(batch),
+                        "created": created,
+                        "updated": len(batch) - created,
+                        "nodes_created": counters.nodes_created,
+                        "relationships_created": counters.relationships_created,
+                        "properties_set": counters.properties_set,
+                        "failed": False,
+                    })
+        
+        entity_rows = sum(b["rows"] for b in batches if b["kind"] == "entities" and not b["failed"])
+        relation_rows = sum(b["rows"] for b in batches if b["kind"] == "relations" and not b["failed"])
+        logger.info(f"✅ Added/Updated {entity_rows} entities and {relation_rows} relations in {len(batches)} batches")
+        
+        return batches
+    
+    @staticmethod
+    def _run_batch(tx, query: str, rows: List[Dict[str, Any]]):
+        return tx.run(query, rows=rows).consume().counters
+    
+    def write_per_row(self, entities: List[Dict], relations: List[Dict]) -> Dict[str, int]:
+        """Write with one auto-commit MERGE per entity and per relation"""
+        with self.driver.session() as session:
+            entities_added = 0
+            relations_added = 0
+            
+            # Add entities with MERGE (handles duplicates gracefully); each row is one mention
+            for entity in entities:
+                key = canonical_key(entity["text"])
+                if not key:
+                    continue
+                row = {"key": key, "name": entity["text"], "type": entity["label"],
+                       "types": [entity["label"]], "mentions": 1}
+                try:
+                    result = session.run(self.queries["entity_row"], row=row)
+                    if result.single():
+                        entities_added += 1
+                except Exception as e:
+                    logger.debug(f"Entity already exists: {entity['text']}")
+                    continue
+            
+            # Add relationships with MERGE (handles duplicates gracefully)
+            for relation in relations:
+                subject_key = canonical_key(relation["subject"])
+                object_key = canonical_key(relation["object"])
+                if not (subject_key and object_key):
+                    continue
+                row = {"subject_key": subject_key, "subject": relation["subject"],
+                       "relation": relation["relation"], "object_key": object_key,
+                       "object": relation["object"], "mentions": 1}
+                try:
+                    result = session.run(self.queries["relation_row"], row=row)
+                    if result.single():
+                        relations_added += 1
+                except Exception as e:
+                    logger.debug(f"Relation already exists")
+                    continue
+            
+            logger.info(f"✅ Added/Updated {entities_added} entities and {relations_added} relations")
+        
+        return {"entities": entities_added, "relations": relations_added}
@@ -2,10 +2,54 @@
 Hybrid Retriever combining RAG and Knowledge Graph
 """
 import logging
-from typing import Dict, Any
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+from config.config import config
+from utilis.query_router import QueryRouter
+from utilis.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+def _count_tokens(text: str) -> int:
+    """Count prompt tokens (falls back to ~4 characters per token)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+class BackendPool:
+    """Worker threads for one backend, with outstanding calls bounded by the pool size
+    
+    A call that outlives its timeout keeps its worker until it returns, so
+    each backend gets its own pool: a hung Neo4j query cannot starve RAG.
+    """
+    
+    def __init__(self, name: str, max_workers: int):
+        self.max_workers = max(1, max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"hybrid-{name}")
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+    
+    def submit(self, fn: Callable, *args, wait: Optional[float] = None, **kwargs) -> Optional[Future]:
+        """Run fn on a free worker; None if none frees up within wait seconds (None waits forever)"""
+        if not self._slots.acquire(timeout=wait):
+            return None
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
 class HybridRetriever:
     """Hybrid retriever combining RAG and KG pipelines"""
     
@@ -13,6 +57,31 @@ class HybridRetriever:
         """Initialize hybrid retriever"""
         self.rag_pipeline = rag_pipeline
         self.kg_pipeline = kg_pipeline
+        
+        # Near-identical questions are answered from the semantic cache
+        self.semantic_cache = None
+        if config.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                ttl=config.SEMANTIC_CACHE_TTL,
+                maxsize=config.SEMANTIC_CACHE_SIZE,
+            )
+        
+        # Router deciding per question which backends are worth a network call
+        self.router = None
+        if config.QUERY_ROUTING_ENABLED:
+            self.router = QueryRouter(
+                nlp=getattr(kg_pipeline, "nlp", None),
+                min_samples=config.ROUTER_MIN_SAMPLES,
+                min_hit_rate=config.ROUTER_MIN_HIT_RATE,
+                explore_rate=config.ROUTER_EXPLORE_RATE,
+            )
+        
+        # Worker threads for querying both backends at once, one pool per backend
+        self.pools = {
+            name: BackendPool(name, config.HYBRID_BACKEND_WORKERS) for name in ("rag", "kg")
+        }
+        
         logger.info("Hybrid Retriever initialized")
     
     def query(self, question: str) -> Dict[str, Any]:
@@ -20,13 +89,40 @@ class HybridRetriever:
         try:
             logger.info(f"🔍 Querying hybrid system: {question}")
             
-            # Query RAG pipeline
-            logger.info("📚 Querying Vector Store...")
-            rag_result = self.rag_pipeline.query(question)
+            # Serve near-identical questions from the semantic cache
+            embedding, cached = self._cache_lookup(question)
+            if cached:
+                return cached
+            
+            route = self._route(question)
             
-            # Query KG pipeline
-            logger.info("🕸️ Querying Knowledge Graph...")
-            kg_result = self.kg_pipeline.query_graph(question)
+            if config.HYBRID_MODE == "fused":
+                combined_result = self.fused_query(question, route)
+                if not combined_result["degraded"]:
+                    self._cache_store(question, embedding, combined_result)
+                return combined_result
+            
+            timed_out = []
+            if config.HYBRID_CONCURRENT:
+                rag_result, kg_result, timed_out = self._query_concurrently(question, route)
+            else:
+                rag_result, kg_result = {}, {}
+                
+                # Query RAG pipeline
+                if route["rag"]:
+                    logger.info("📚 Querying Vector Store...")
+                    rag_result = self.rag_pipeline.query(question, k=config.TOP_K)
+                
+                # Query KG pipeline
+                if route["kg"]:
+                    logger.info("🕸️ Querying Knowledge Graph...")
+                    kg_result = self.kg_pipeline.query_graph(question, query_entities=route["graph_terms"])
+            
+            self._record(route, rag_result, kg_result)
+            
+            confidence = self._calculate_confidence(rag_result, kg_result)
+            if timed_out and confidence == "high":
+                confidence = "medium"
             
             # Combine results
             combined_result = {
@@ -35,15 +131,362 @@ class HybridRetriever:
                 "kg_answer": kg_result.get("answer", ""),
                 "kg_entities": kg_result.get("entities", []),
                 "kg_relations": kg_result.get("relations", []),
-                "confidence": self._calculate_confidence(rag_result, kg_result)
+                "confidence": confidence,
+                "degraded": bool(timed_out),
+                "timed_out": timed_out,
+                "failed": [],
+                "skipped": self._skipped(route),
+                "cached": False
             }
             
+            # Partial results are not worth serving to later questions
+            if not timed_out:
+                self._cache_store(question, embedding, combined_result)
+            
             return combined_result
             
         except Exception as e:
             logger.error(f"Hybrid query failed: {e}")
             raise
     
+    def stream_query(self, question: str) -> Iterator[Dict[str, Any]]:
+        """Query both systems and yield answer tokens from each as they arrive
+        
+        Yields {"event": "rag_token" | "kg_token", "token": str} events (or
+        "fused_token" in fused mode), a {"event": "rag_error" | "kg_error",
+        "error": str} event if a stream breaks off, then a final
+        {"event": "result", "result": combined_result} event.
+        """
+        logger.info(f"🔍 Streaming hybrid query: {question}")
+        
+        embedding, cached = self._cache_lookup(question)
+        if cached:
+            yield {"event": "result", "result": cached}
+            return
+        
+        route = self._route(question)
+        docs, graph_results, timed_out, failed = self._retrieve_both(question, route)
+        
+        # Fused mode: one completion over both contexts
+        if config.HYBRID_MODE == "fused":
+            tokens = []
+            for chunk in self.rag_pipeline.llm.stream(self._fused_prompt(question, docs, graph_results)):
+                if chunk.content:
+                    tokens.append(chunk.content)
+                    yield {"event": "fused_token", "token": chunk.content}
+            
+            combined_result = self._fused_result(
+                "".join(tokens).strip(), docs, graph_results, route, timed_out, failed
+            )
+            if not combined_result["degraded"]:
+                self._cache_store(question, embedding, combined_result)
+            yield {"event": "result", "result": combined_result}
+            return
+        
+        # Both answers stream in parallel; tokens are merged through one queue
+        events = queue.Queue()
+        answers = {"rag": [], "kg": []}
+        cancelled = set()
+        
+        def produce(name: str, tokens: Iterator[str]):
+            try:
+                for token in tokens:
+                    # Stop pulling tokens once the consumer has given up on this stream
+                    if name in cancelled:
+                        break
+                    events.put((name, token))
+            except Exception as e:
+                logger.error(f"{name.upper()} answer streaming failed: {e}")
+                events.put((name, e))
+            finally:
+                events.put((name, None))
+        
+        # A backend whose retrieval failed or timed out has nothing to answer from
+        for name in timed_out:
+            yield {"event": f"{name}_error", "error": "retrieval timed out"}
+        for name in failed:
+            yield {"event": f"{name}_error", "error": "retrieval failed"}
+        
+        # Each answer must finish within its backend's timeout, counted from here
+        started = time.monotonic()
+        timeouts = {"rag": config.RAG_TIMEOUT, "kg": config.KG_TIMEOUT}
+        streams = {
+            "rag": lambda: self.rag_pipeline.stream_answer(question, docs),
+            "kg": lambda: self.kg_pipeline.stream_answer_from_graph(question, graph_results),
+        }
+        deadlines = {}
+        for name, stream in streams.items():
+            if not route[name] or name in timed_out or name in failed:
+                continue
+            if self.pools[name].submit(produce, name, stream(), wait=0) is None:
+                logger.warning(f"⏱️ {name.upper()} workers all busy with earlier queries, returning partial result")
+                timed_out.append(name)
+                yield {"event": f"{name}_error", "error": "all workers busy"}
+                continue
+            deadlines[name] = started + timeouts[name]
+        
+        try:
+            while deadlines:
+                try:
+                    name, token = events.get(timeout=max(0.0, min(deadlines.values()) - time.monotonic()))
+                except queue.Empty:
+                    now = time.monotonic()
+                    for name in [name for name, deadline in deadlines.items() if deadline <= now]:
+                        # The worker stops at its next token; the partial answer is kept
+                        logger.warning(f"⏱️ {name.upper()} answer timed out after {timeouts[name]}s, returning partial result")
+                        del deadlines[name]
+                        cancelled.add(name)
+                        timed_out.append(name)
+                        yield {"event": f"{name}_error", "error": f"timed out after {timeouts[name]}s"}
+                    continue
+                
+                if name not in deadlines:
+                    continue
+                if token is None:
+                    del deadlines[name]
+                    continue
+                if isinstance(token, Exception):
+                    failed.append(name)
+                    yield {"event": f"{name}_error", "error": str(token)}
+                    continue
+                answers[name].append(token)
+                yield {"event": f"{name}_token", "token": token}
+        finally:
+            cancelled.update(streams)
+        
+        rag_result = {"answer": "".join(answers["rag"]).strip(), "sources": [doc.metadata for doc in docs]}
+        kg_result = dict(graph_results, answer="".join(answers["kg"]).strip())
+        self._record(route, rag_result, kg_result)
+        
+        degraded = bool(timed_out or failed)
+        confidence = self._calculate_confidence(rag_result, kg_result)
+        if degraded and confidence == "high":
+            confidence = "medium"
+        
+        combined_result = {
+            "rag_answer": rag_result["answer"],
+            "rag_sources": rag_result["sources"],
+            "kg_answer": kg_result["answer"],
+            "kg_entities": kg_result.get("entities", []),
+            "kg_relations": kg_result.get("relations", []),
+            "confidence": confidence,
+            "degraded": degraded,
+            "timed_out": timed_out,
+            "failed": failed,
+            "skipped": self._skipped(route),
+            "cached": False
+        }
+        
+        # An answer cut off by a failed or timed-out stream is not worth serving to later questions
+        if not degraded:
+            self._cache_store(question, embedding, combined_result)
+        
+        yield {"event": "result", "result": combined_result}
+    
+    def fused_query(self, question: str, route: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Retrieve chunks and graph facts without the LLM, then answer with one completion"""
+        logger.info("🔀 Fused query: retrieving vector chunks and graph facts...")
+        route = route or self._route(question)
+        docs, graph_results, timed_out, failed = self._retrieve_both(question, route)
+        
+        response = self.rag_pipeline.llm.invoke(self._fused_prompt(question, docs, graph_results))
+        answer = response.content if hasattr(response, 'content') else str(response)
+        
+        return self._fused_result(answer.strip(), docs, graph_results, route, timed_out, failed)
+    
+    def _fused_result(self, answer: str, docs: List[Any], graph_results: Dict, route: Dict[str, Any],
+                      timed_out: List[str], failed: List[str]) -> Dict[str, Any]:
+        """Build the combined result for a fused answer"""
+        rag_result = {"answer": answer, "sources": [doc.metadata for doc in docs]}
+        self._record(route, rag_result, graph_results)
+        
+        confidence = self._calculate_confidence(rag_result, {"answer": answer, **graph_results})
+        if (timed_out or failed) and confidence == "high":
+            confidence = "medium"
+        
+        return {
+            "mode": "fused",
+            "answer": answer,
+            "rag_answer": answer,
+            "rag_sources": rag_result["sources"],
+            "kg_answer": "",
+            "kg_entities": graph_results.get("entities", []),
+            "kg_relations": graph_results.get("relations", []),
+            "confidence": confidence,
+            "degraded": bool(timed_out or failed),
+            "timed_out": timed_out,
+            "failed": failed,
+            "skipped": self._skipped(route),
+            "cached": False
+        }
+    
+    def _fused_prompt(self, question: str, docs: List[Any], graph_results: Dict) -> str:
+        """Pack graph facts and vector chunks into one prompt within FUSED_CONTEXT_TOKENS"""
+        budget = config.FUSED_CONTEXT_TOKENS
+        
+        # Graph facts are compact, so they go in first
+        facts = []
+        entities = list(dict.fromkeys(graph_results.get("entities", [])))
+        if entities:
+            line = "Entities: " + ", ".join(entities[:20])
+            facts.append(line)
+            budget -= _count_tokens(line)
+        for relation in dict.fromkeys(graph_results.get("relations", [])):
+            cost = _count_tokens(relation)
+            if cost > budget:
+                break
+            facts.append(relation)
+            budget -= cost
+        
+        # Then as many retrieved chunks as still fit, in rank order
+        passages = []
+        for i, doc in enumerate(docs, 1):
+            page = doc.metadata.get("page", "N/A")
+            passage = f"[{i}] (page {page}) {doc.page_content}"
+            cost = _count_tokens(passage)
+            if cost > budget:
+                break
+            passages.append(passage)
+            budget -= cost
+        
+        return f"""Answer the question using only the context below.
+If the context does not contain the answer, say you don't know.
+
+Knowledge graph facts:
+{chr(10).join(facts) or "None"}
+
+Textbook passages:
+{chr(10).join(passages) or "None"}
+
+Question: {question}
+
+Answer:"""
+    
+    def _retrieve_both(self, question: str,
+                       route: Dict[str, Any]) -> Tuple[List[Any], Dict, List[str], List[str]]:
+        """Retrieve vector chunks and graph facts concurrently, without any LLM call
+        
+        Returns (docs, graph results, backends that timed out, backends whose
+        retrieval failed). Each backend is bounded by its own timeout.
+        """
+        calls = {}
+        if route["rag"]:
+            calls["rag"] = (lambda: self.rag_pipeline.retrieve(question, k=config.TOP_K), config.RAG_TIMEOUT)
+        if route["kg"]:
+            calls["kg"] = (
+                lambda: self.kg_pipeline.retrieve_graph(question, query_entities=route["graph_terms"]),
+                config.KG_TIMEOUT,
+            )
+        results, timed_out = self._gather(calls)
+        
+        docs = results.get("rag", [])
+        if isinstance(docs, Exception):
+            raise docs
+        
+        failed = []
+        graph_results = results.get("kg", {"entities": [], "relations": [], "answer": ""})
+        if isinstance(graph_results, Exception):
+            # A graph failure should not block the RAG answer
+            logger.error(f"Graph query failed: {graph_results}")
+            graph_results = {"entities": [], "relations": [], "answer": ""}
+            failed.append("kg")
+        
+        return docs, graph_results, timed_out, failed
+    
+    def _route(self, question: str) -> Dict[str, Any]:
+        """Ask the router which backends to query (both when routing is disabled)"""
+        if not self.router:
+            return {"rag": True, "kg": True, "question_type": None, "graph_terms": None, "reasons": []}
+        return self.router.route(question)
+    
+    def _record(self, route: Dict[str, Any], rag_result: Dict, kg_result: Dict):
+        """Feed backend outcomes back into the router's hit-rate history"""
+        if self.router:
+            self.router.record(route, rag_result, kg_result)
+    
+    @staticmethod
+    def _skipped(route: Dict[str, Any]) -> List[str]:
+        return [name for name in ("rag", "kg") if not route[name]]
+    
+    def router_stats(self) -> Dict[str, Any]:
+        """Return query router metrics, including skipped backend calls"""
+        return self.router.stats() if self.router else {}
+    
+    def _cache_lookup(self, question: str) -> Tuple[Any, Any]:
+        """Return (question embedding, cached result or None)"""
+        if not self.semantic_cache:
+            return None, None
+        
+        embedding = self.rag_pipeline.embed_question(question)
+        cached = self.semantic_cache.lookup(embedding, self.rag_pipeline.documents_version)
+        if not cached:
+            return embedding, None
+        
+        logger.info(f"⚡ Semantic cache hit ({cached['similarity']:.3f}): {cached['question']}")
+        return embedding, dict(
+            cached["result"],
+            cached=True,
+            cached_question=cached["question"],
+            cache_similarity=cached["similarity"],
+        )
+    
+    def _cache_store(self, question: str, embedding: Any, result: Dict[str, Any]):
+        """Remember a result in the semantic cache"""
+        if self.semantic_cache:
+            self.semantic_cache.store(question, embedding, result, self.rag_pipeline.documents_version)
+    
+    def _query_concurrently(self, question: str, route: Dict[str, Any]) -> Tuple[Dict, Dict, List[str]]:
+        """Query the routed backends in parallel, each bounded by its own timeout"""
+        logger.info("📚🕸️ Querying Vector Store and Knowledge Graph concurrently...")
+        
+        calls = {}
+        if route["rag"]:
+            calls["rag"] = (lambda: self.rag_pipeline.query(question, k=config.TOP_K), config.RAG_TIMEOUT)
+        if route["kg"]:
+            calls["kg"] = (
+                lambda: self.kg_pipeline.query_graph(question, query_entities=route["graph_terms"]),
+                config.KG_TIMEOUT,
+            )
+        results, timed_out = self._gather(calls)
+        
+        for result in results.values():
+            if isinstance(result, Exception):
+                raise result
+        return results.get("rag", {}), results.get("kg", {}), timed_out
+    
+    def _gather(self, calls: Dict[str, Tuple[Callable[[], Any], float]]) -> Tuple[Dict[str, Any], List[str]]:
+        """Run {backend: (call, timeout)} on the backend pools and wait for each until its timeout
+        
+        Returns the results by backend (the exception, if a call raised) and the
+        backends that timed out or found every worker busy.
+        """
+        started = time.monotonic()
+        futures = {
+            name: (self.pools[name].submit(call, wait=0), timeout)
+            for name, (call, timeout) in calls.items()
+        }
+        
+        results = {}
+        timed_out = []
+        for name, (future, timeout) in futures.items():
+            if future is None:
+                # Every worker is still held by earlier timed-out calls; don't queue behind them
+                logger.warning(f"⏱️ {name.upper()} workers all busy with earlier queries, returning partial result")
+                timed_out.append(name)
+                continue
+            
+            remaining = max(0.0, timeout - (time.monotonic() - started))
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # The worker keeps running in the background; its result is discarded
+                logger.warning(f"⏱️ {name.upper()} query timed out after {timeout}s, returning partial result")
+                timed_out.append(name)
+            except Exception as e:
+                results[name] = e
+        
+        return results, timed_out
+    
     def _calculate_confidence(self, rag_result: Dict, kg_result: Dict) -> str:
         """Calculate confidence score based on both results"""
         try:
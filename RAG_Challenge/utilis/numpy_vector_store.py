@@ -0,0 +1,227 @@
+"""
+Embedded vector store backed by a memory-mapped .npy file
+"""
+import ast
+import json
+import logging
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Fixed .npy header size so the shape can be rewritten in place on append
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_LEN = 128
+
+class NumpyVectorStore(VectorStore):
+    """Local, zero-network vector store for single-node deployments and CI
+    
+    Normalized float32 embeddings live in an append-only memory-mapped .npy
+    file with a JSON-lines sidecar holding text and metadata. Search is a
+    blocked matrix multiply (cosine similarity) followed by a top-k merge.
+    """
+    
+    def __init__(self, embedding: Embeddings, directory: str, block_size: int = 65536):
+        """Open (or create) the store in a directory"""
+        self.embedding = embedding
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "embeddings.npy"
+        self.metadata_path = self.directory / "metadata.jsonl"
+        self.block_size = block_size
+        
+        self._lock = threading.Lock()
+        self._records: List[dict] = []
+        self._vectors: Optional[np.ndarray] = None
+        self.dimension: Optional[int] = None
+        
+        if self.metadata_path.exists():
+            self._records = self._load_records()
+        if self.vectors_path.exists():
+            self._open_vectors()
+        
+        logger.info(f"Numpy vector store opened at {self.directory} ({len(self._records)} vectors)")
+    
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+    
+    def _load_records(self) -> List[dict]:
+        """Read the metadata sidecar, cutting off a last line left incomplete by a crash"""
+        with open(self.metadata_path, "rb") as f:
+            data = f.read()
+        
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logger.warning(f"⚠️ Dropping a truncated record at the end of {self.metadata_path}")
+            with open(self.metadata_path, "r+b") as f:
+                f.truncate(complete)
+        
+        return [json.loads(line) for line in data[:complete].decode("utf-8").splitlines() if line.strip()]
+    
+    def _write_header(self, f, rows: int, dimension: int):
+        """Write a version 1.0 .npy header padded to NPY_HEADER_LEN bytes"""
+        header = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, dimension)})
+        padding = NPY_HEADER_LEN - len(NPY_MAGIC) - 2 - len(header) - 1
+        f.seek(0)
+        f.write(NPY_MAGIC)
+        f.write((NPY_HEADER_LEN - len(NPY_MAGIC) - 2).to_bytes(2, "little"))
+        f.write(header.encode("latin1") + b" " * padding + b"\n")
+    
+    def _open_vectors(self):
+        """(Re)map the vector file read-only and swap it in for searches"""
+        with open(self.vectors_path, "rb") as f:
+            f.seek(len(NPY_MAGIC) + 2)
+            header = ast.literal_eval(f.read(NPY_HEADER_LEN - len(NPY_MAGIC) - 2).decode("latin1"))
+        
+        # Only rows with a complete metadata record are searchable
+        rows, self.dimension = header["shape"]
+        rows = min(rows, len(self._records))
+        if rows == 0:
+            vectors = np.empty((0, self.dimension), dtype=np.float32)
+        else:
+            vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r",
+                offset=NPY_HEADER_LEN, shape=(rows, self.dimension)
+            )
+        self._vectors = vectors
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so dot product equals cosine similarity"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def add_embeddings(self, texts: Iterable[str], embeddings: List[List[float]],
+                       metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Append pre-computed embeddings with their texts and metadata"""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                with open(self.vectors_path, "wb") as f:
+                    self._write_header(f, 0, self.dimension)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-d embeddings, got {vectors.shape[1]}-d")
+            
+            # Vectors first, then metadata, then the header: a crash leaves at most
+            # unreferenced trailing bytes, never a row without its vector. Writing
+            # right after the last referenced row (and cutting anything beyond it)
+            # keeps those bytes from shifting the rows appended later. Searches keep
+            # using the current map, which covers only rows that are not rewritten,
+            # until _open_vectors swaps in the new one.
+            rows = len(self._records) + len(texts)
+            with open(self.vectors_path, "r+b") as f:
+                f.seek(NPY_HEADER_LEN + len(self._records) * self.dimension * 4)
+                f.truncate()
+                f.write(vectors.astype("<f4").tobytes())
+                
+                with open(self.metadata_path, "a", encoding="utf-8") as meta:
+                    for id_, text, metadata in zip(ids, texts, metadatas):
+                        record = {"id": id_, "text": text, "metadata": metadata}
+                        meta.write(json.dumps(record) + "\n")
+                        self._records.append(record)
+                
+                self._write_header(f, rows, self.dimension)
+            
+            self._open_vectors()
+        
+        return ids
+    
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        """Embed texts and append them to the store"""
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas, **kwargs)
+    
+    def _top_k(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """Blocked matmul top-k for a batch of normalized queries"""
+        # One snapshot for the whole search; appends swap in a new map atomically
+        vectors = self._vectors
+        if vectors is None or len(vectors) == 0:
+            return [[] for _ in queries]
+        
+        k = min(k, len(vectors))
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        
+        for start in range(0, len(vectors), self.block_size):
+            block_scores = queries @ np.asarray(vectors[start:start + self.block_size]).T
+            block_ids = np.broadcast_to(
+                np.arange(start, start + block_scores.shape[1]), block_scores.shape
+            )
+            
+            # Keep the top k of (previous best + this block)
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            ids = np.concatenate([best_ids, block_ids], axis=1)
+            
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                ids = np.take_along_axis(ids, keep, axis=1)
+            best_scores, best_ids = scores, ids
+        
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        
+        return [
+            list(zip(row_ids.tolist(), row_scores.tolist()))
+            for row_ids, row_scores in zip(best_ids, best_scores)
+        ]
+    
+    def _to_document(self, index: int) -> Document:
+        record = self._records[index]
+        return Document(page_content=record["text"], metadata=record["metadata"])
+    
+    def batch_similarity_search_by_vectors(self, embeddings: List[List[float]],
+                                           k: int = 4) -> List[List[Tuple[Document, float]]]:
+        """Search many query vectors in one pass; returns (doc, cosine distance) per query"""
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        return [
+            [(self._to_document(index), 1.0 - score) for index, score in hits]
+            for hits in self._top_k(queries, k)
+        ]
+    
+    def similarity_search_with_score_by_vector(self, embedding: List[float],
+                                               k: int = 4) -> List[Tuple[Document, float]]:
+        """Return (doc, cosine distance) pairs, closest first"""
+        return self.batch_similarity_search_by_vectors([embedding], k)[0]
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+    
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+    
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
+    
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._cosine_relevance_score_fn
+    
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, directory: str = "vector_store",
+                   **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding=embedding, directory=directory)
+        store.add_texts(texts, metadatas)
+        return store
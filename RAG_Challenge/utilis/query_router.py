@@ -0,0 +1,151 @@
+"""
+Query router deciding which backends (RAG, KG or both) a question needs
+"""
+import logging
+import random
+import re
+import threading
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Question types by leading cue words, checked in order
+QUESTION_TYPES = [
+    ("relation", ("relationship", "relation", "related", "relate", "between", "connected", "connection", "linked")),
+    ("comparison", ("compare", "comparison", "difference", "differ", "versus", "vs")),
+    ("person", ("who", "whom", "whose")),
+    ("time", ("when", "year", "date", "century", "period")),
+    ("place", ("where", "located", "location")),
+    ("definition", ("define", "definition", "meaning", "what")),
+    ("explanation", ("why", "how", "explain", "describe", "cause", "effect")),
+    ("list", ("list", "which", "name", "examples")),
+]
+
+# Types answered from entity facts, where the graph is expected to do well
+GRAPH_TYPES = {"relation", "person", "time", "place"}
+
+# Phrases that mark a RAG answer as a miss
+RAG_MISS_PHRASES = ("don't know", "do not know", "not mentioned", "no information", "not provided")
+
+class QueryRouter:
+    """Decide before any network call whether a question goes to RAG, KG or both"""
+    
+    def __init__(self, nlp=None, min_samples: int = 20, min_hit_rate: float = 0.2,
+                 explore_rate: float = 0.1, history_size: int = 100):
+        """Create a router using a spaCy pipeline and a per-question-type hit-rate history"""
+        self.nlp = nlp
+        self.min_samples = min_samples
+        self.min_hit_rate = min_hit_rate
+        self.explore_rate = explore_rate
+        
+        # Recent hit/miss outcomes per (question type, backend)
+        self._history = defaultdict(lambda: deque(maxlen=history_size))
+        self._lock = threading.Lock()
+        
+        self.metrics = Counter()
+        self.skip_reasons = Counter()
+    
+    def question_type(self, question: str) -> str:
+        """Classify a question from cheap lexical cues"""
+        words = set(re.findall(r"[a-z]+", question.lower()))
+        for name, cues in QUESTION_TYPES:
+            if words.intersection(cues):
+                return name
+        return "other"
+    
+    def graph_terms(self, question: str) -> List[str]:
+        """Entities, or failing that noun chunks, the graph lookup would search for"""
+        doc = self.nlp(question)
+        terms = [ent.text for ent in doc.ents]
+        if not terms:
+            terms = [chunk.text for chunk in doc.noun_chunks][:3]
+        return terms
+    
+    def route(self, question: str) -> Dict[str, Any]:
+        """Return {"rag", "kg", "question_type", "graph_terms", "reasons"} for a question"""
+        question_type = self.question_type(question)
+        decision = {
+            "rag": True,
+            "kg": True,
+            "question_type": question_type,
+            "graph_terms": None,
+            "reasons": [],
+        }
+        
+        # Without entities or noun chunks the graph lookup has nothing to match
+        if self.nlp is not None:
+            try:
+                decision["graph_terms"] = self.graph_terms(question)
+            except Exception as e:
+                logger.warning(f"Router entity extraction failed: {e}")
+        if decision["graph_terms"] == []:
+            decision["kg"] = False
+            decision["reasons"].append("kg:no_graph_terms")
+        
+        # Skip a backend that has rarely helped this question type, exploring now and then
+        # so a backend that starts answering (e.g. after ingestion) is noticed again
+        if decision["kg"] and self._rarely_hits(question_type, "kg"):
+            decision["kg"] = False
+            decision["reasons"].append("kg:low_hit_rate")
+        
+        # The text search is the default backend; it is only skipped for graph-style
+        # questions that the graph can answer and the text search historically cannot
+        if (decision["kg"] and question_type in GRAPH_TYPES
+                and self._rarely_hits(question_type, "rag")):
+            decision["rag"] = False
+            decision["reasons"].append("rag:low_hit_rate")
+        
+        with self._lock:
+            self.metrics["questions"] += 1
+            for backend in ("rag", "kg"):
+                self.metrics[f"{backend}_queried" if decision[backend] else f"{backend}_skipped"] += 1
+            self.skip_reasons.update(decision["reasons"])
+        
+        if decision["reasons"]:
+            logger.info(f"🧭 Routed {question_type} question: {', '.join(decision['reasons'])}")
+        
+        return decision
+    
+    def _rarely_hits(self, question_type: str, backend: str) -> bool:
+        """True if the backend's hit rate for this type is known and below the minimum"""
+        with self._lock:
+            outcomes = self._history[(question_type, backend)]
+            if len(outcomes) < self.min_samples:
+                return False
+            hit_rate = sum(outcomes) / len(outcomes)
+        
+        return hit_rate < self.min_hit_rate and random.random() >= self.explore_rate
+    
+    def record(self, decision: Dict[str, Any], rag_result: Dict, kg_result: Dict):
+        """Record whether each queried backend produced a useful answer"""
+        question_type = decision["question_type"]
+        with self._lock:
+            if decision["rag"] and rag_result:
+                self._history[(question_type, "rag")].append(self._is_rag_hit(rag_result))
+            if decision["kg"] and kg_result:
+                self._history[(question_type, "kg")].append(self._is_kg_hit(kg_result))
+    
+    @staticmethod
+    def _is_rag_hit(rag_result: Dict) -> bool:
+        answer = (rag_result.get("answer") or "").lower()
+        return bool(rag_result.get("sources")) and bool(answer) and not any(
+            phrase in answer for phrase in RAG_MISS_PHRASES
+        )
+    
+    @staticmethod
+    def _is_kg_hit(kg_result: Dict) -> bool:
+        return bool(kg_result.get("entities") or kg_result.get("relations"))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return routing counters, skip reasons and hit rates per question type"""
+        with self._lock:
+            hit_rates = {
+                f"{question_type}:{backend}": round(sum(outcomes) / len(outcomes), 3)
+                for (question_type, backend), outcomes in self._history.items() if outcomes
+            }
+            return {
+                **dict(self.metrics),
+                "skip_reasons": dict(self.skip_reasons),
+                "hit_rates": hit_rates,
+            }
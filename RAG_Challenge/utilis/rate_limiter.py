@@ -0,0 +1,51 @@
+"""
+Token-bucket rate limiting shared by threaded and asyncio callers
+"""
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute: float, capacity: float = None):
+        """Create a bucket; a non-positive rate disables limiting"""
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether this bucket limits anything"""
+        return self.rate > 0
+    
+    def _reserve(self, amount: float) -> float:
+        """Take tokens (possibly going negative) and return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            # Requests larger than the bucket can never fit; let them through at capacity
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    def acquire(self, amount: float = 1):
+        """Block the calling thread until the tokens are available"""
+        if not self.enabled:
+            return
+        wait = self._reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def aacquire(self, amount: float = 1):
+        """Wait in the event loop until the tokens are available"""
+        if not self.enabled:
+            return
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,286 @@
+"""
+Concurrent, rate-limited LLM relation extraction for knowledge graph building
+"""
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, ValidationError, validator
+
+from utilis.embedding_scheduler import is_rate_limit_error
+from utilis.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RELATION_PROMPT = PromptTemplate(
+    input_variables=["text"],
+    template="""
+                Extract key relationships from the following text.
+                Format: Subject -> Relationship -> Object
+                
+                Text: {text}
+                
+                Relationships:
+                """
+)
+
+PACKED_RELATION_PROMPT = PromptTemplate(
+    input_variables=["texts"],
+    template="""Extract key relationships from each of the texts below.
+Return only a JSON object that maps every text id to a list of relationships, for example:
+{{"c0": [{{"subject": "Ashoka", "relation": "ruled", "object": "Maurya Empire"}}], "c1": []}}
+Use an empty list for a text without relationships. Do not add other keys.
+
+{texts}
+"""
+)
+
+# Output budget reserved per chunk when estimating tokens
+COMPLETION_TOKENS = 256
+
+# Bump when a prompt or its parsing changes, so cached extractions are not reused
+PROMPT_VERSION = "1"
+
+class Relation(BaseModel):
+    """Schema of one extracted relation"""
+    subject: str
+    relation: str
+    object: str
+    
+    @validator("subject", "relation", "object")
+    def not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("must not be blank")
+        return value
+
+def parse_relations(relations_text: str) -> List[Dict[str, str]]:
+    """Parse 'Subject -> Relationship -> Object' lines"""
+    relations = []
+    for line in relations_text.split('\n'):
+        if '->' in line:
+            parts = line.split('->')
+            if len(parts) == 3:
+                relations.append({
+                    "subject": parts[0].strip(),
+                    "relation": parts[1].strip(),
+                    "object": parts[2].strip()
+                })
+    return relations
+
+def parse_packed_relations(response_text: str, chunk_ids: List[str]) -> Tuple[Dict[str, List[Dict[str, str]]], int]:
+    """Validate a packed JSON reply; return relations per chunk id and the number of invalid items
+    
+    Raises ValueError when the reply is not a JSON object, so the request is retried.
+    Chunk ids the reply leaves out (or maps to something other than a list) are
+    left out of the result, so the caller can retry them.
+    """
+    text = response_text.strip()
+    if text.startswith("```"):
+        # Tolerate a fenced code block around the JSON
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("packed extraction reply is not a JSON object")
+    
+    results = {}
+    invalid = 0
+    for chunk_id in chunk_ids:
+        if chunk_id not in data:
+            continue
+        items = data[chunk_id]
+        if not isinstance(items, list):
+            invalid += 1
+            continue
+        
+        relations = []
+        for item in items:
+            try:
+                relations.append(Relation.parse_obj(item).dict())
+            except (ValidationError, TypeError):
+                invalid += 1
+        results[chunk_id] = relations
+    
+    return results, invalid
+
+
+class RelationExtractor:
+    """Extract relations from many chunks on a thread pool under request and token budgets
+    
+    In packed mode several chunks share one request (up to pack_token_budget
+    input tokens) and the model replies with JSON relations keyed by chunk id.
+    """
+    
+    def __init__(self, llm, max_workers: int = 4, requests_per_minute: int = 500,
+                 tokens_per_minute: int = 200_000, max_retries: int = 3, max_chars: int = 3000,
+                 packed: bool = False, pack_token_budget: int = 3000, pack_max_chunks: int = 8,
+                 json_mode: bool = True):
+        """Wrap a chat model; texts longer than max_chars are not sent to the LLM"""
+        self.llm = llm
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.max_chars = max_chars
+        
+        self.packed = packed
+        self.pack_token_budget = pack_token_budget
+        self.pack_max_chunks = max(1, pack_max_chunks)
+        self.packed_llm = llm.bind(response_format={"type": "json_object"}) if packed and json_mode else llm
+        
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        
+        self.stats = {
+            "requests": 0, "retries": 0, "rate_limited": 0, "failed": 0, "skipped": 0,
+            "packed_requests": 0, "packed_chunks": 0, "packed_missing": 0, "invalid_relations": 0,
+        }
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def prompt_version(self) -> str:
+        """Identifies the prompt (and so the output) this extractor produces"""
+        return f"{'packed' if self.packed else 'single'}-v{PROMPT_VERSION}"
+    
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Cheap token estimate (~4 characters per token)"""
+        return len(text) // 4 + 1
+    
+    def request_tokens(self, text: str) -> int:
+        """Estimated input and output tokens for extracting one text on its own"""
+        return self._estimate_tokens(RELATION_PROMPT.format(text=text)) + COMPLETION_TOKENS
+    
+    def _invoke(self, llm, prompt: str, tokens: int, parse: Callable[[str], Any]) -> Optional[Any]:
+        """Call the LLM under the rate limits and parse the reply, retrying with backoff
+        
+        Returns None once all retries have failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(tokens)
+            self._count("requests")
+            try:
+                response = llm.invoke(prompt)
+                return parse(response.content if hasattr(response, 'content') else str(response))
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failed")
+                    logger.warning(f"LLM relation extraction failed: {e}")
+                    return None
+                
+                # Back off exponentially with jitter, longer after a 429
+                rate_limited = is_rate_limit_error(e)
+                self._count("rate_limited" if rate_limited else "retries")
+                delay = (2.0 if rate_limited else 0.5) * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay / 2))
+        
+        return None
+    
+    def extract(self, text: str) -> Optional[List[Dict[str, str]]]:
+        """Extract relations from one text, retrying with backoff; None if it keeps failing"""
+        if len(text) >= self.max_chars:  # Only use LLM for shorter texts
+            self._count("skipped")
+            return []
+        
+        prompt = RELATION_PROMPT.format(text=text)
+        return self._invoke(self.llm, prompt, self.request_tokens(text), parse_relations)
+    
+    def extract_packed(self, texts: List[str]) -> List[Optional[List[Dict[str, str]]]]:
+        """Extract relations for several texts with one JSON request, in input order
+        
+        If the reply never validates, each text falls back to its own request,
+        as does each text the reply leaves out.
+        """
+        chunk_ids = [f"c{i}" for i in range(len(texts))]
+        body = "\n\n".join(f"[{chunk_id}]\n{text}" for chunk_id, text in zip(chunk_ids, texts))
+        prompt = PACKED_RELATION_PROMPT.format(texts=body)
+        tokens = self._estimate_tokens(prompt) + COMPLETION_TOKENS * len(texts)
+        
+        self._count("packed_requests")
+        self._count("packed_chunks", len(texts))
+        parsed = self._invoke(self.packed_llm, prompt, tokens, lambda reply: parse_packed_relations(reply, chunk_ids))
+        if parsed is None:
+            logger.warning(f"Packed extraction failed, retrying {len(texts)} chunks one by one")
+            return [self.extract(text) for text in texts]
+        
+        results, invalid = parsed
+        if invalid:
+            self._count("invalid_relations", invalid)
+        
+        # A chunk missing from the reply is a failure, not "no relations": retry it alone
+        missing = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in results]
+        if missing:
+            logger.warning(f"Packed reply left out {len(missing)} of {len(texts)} chunks, retrying them one by one")
+            self._count("packed_missing", len(missing))
+            for i in missing:
+                results[chunk_ids[i]] = self.extract(texts[i])
+        return [results[chunk_id] for chunk_id in chunk_ids]
+    
+    def pack(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into packs under the token budget and chunk cap"""
+        packs = []
+        current, used = [], 0
+        for index, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+            if current and (used + tokens > self.pack_token_budget or len(current) >= self.pack_max_chunks):
+                packs.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    def _extract_group(self, texts: List[str], indices: List[int]) -> List[Tuple[int, Optional[List[Dict[str, str]]]]]:
+        """Extract one unit of work: a single chunk, or a pack in packed mode"""
+        if not self.packed:
+            return [(index, self.extract(texts[index])) for index in indices]
+        
+        # Long chunks keep the single-chunk rule and skip the LLM
+        sendable = [index for index in indices if len(texts[index]) < self.max_chars]
+        results = {index: [] for index in indices}
+        self._count("skipped", len(indices) - len(sendable))
+        if sendable:
+            for index, relations in zip(sendable, self.extract_packed([texts[index] for index in sendable])):
+                results[index] = relations
+        return list(results.items())
+    
+    def extract_many(self, texts: List[str]) -> Iterator[Tuple[int, Optional[List[Dict[str, str]]]]]:
+        """Yield (index, relations) for each text as soon as its extraction finishes
+        
+        At most max_workers requests are in flight, so results can be written
+        while later chunks are still being extracted. relations is None for a
+        text whose extraction failed after all retries.
+        """
+        groups = self.pack(texts) if self.packed else [[index] for index in range(len(texts))]
+        pending = iter(groups)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="relations") as executor:
+            in_flight = set()
+            
+            def submit_next() -> bool:
+                indices = next(pending, None)
+                if indices is None:
+                    return False
+                in_flight.add(executor.submit(self._extract_group, texts, indices))
+                return True
+            
+            while len(in_flight) < self.max_workers and submit_next():
+                pass
+            
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    submit_next()
+                    yield from future.result()
@@ -0,0 +1,115 @@
+"""
+Semantic answer cache keyed by question embedding similarity
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """Return stored results for questions whose embedding is close enough to a previous one"""
+    
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600, maxsize: int = 512):
+        """Create a cache with a cosine similarity threshold, TTL (seconds) and capacity"""
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._version = None
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _check_version(self, version: Any):
+        """Drop everything when the underlying documents changed"""
+        if version != self._version:
+            if self._entries:
+                logger.info("Semantic cache invalidated after document ingestion")
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+            self._entries = []
+            self._version = version
+    
+    def _expire(self):
+        """Remove entries older than the TTL"""
+        if self.ttl <= 0 or not self._entries:
+            return
+        now = time.monotonic()
+        keep = [i for i, entry in enumerate(self._entries) if now - entry["stored"] < self.ttl]
+        if len(keep) < len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._vectors = self._vectors[keep]
+    
+    def lookup(self, embedding: List[float], version: Any = None) -> Optional[Dict[str, Any]]:
+        """Return the best cached entry above the threshold, or None"""
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            
+            if not self._entries:
+                self.misses += 1
+                return None
+            
+            similarities = self._vectors @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            entry = self._entries[best]
+            entry["last_hit"] = time.monotonic()
+            return {
+                "question": entry["question"],
+                "result": entry["result"],
+                "similarity": similarity,
+            }
+    
+    def store(self, question: str, embedding: List[float], result: Dict[str, Any], version: Any = None):
+        """Store a result, evicting the least recently used entry at capacity"""
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            
+            if len(self._entries) >= self.maxsize:
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_hit"])
+                del self._entries[oldest]
+                self._vectors = np.delete(self._vectors, oldest, axis=0)
+            
+            now = time.monotonic()
+            self._entries.append({"question": question, "result": result, "stored": now, "last_hit": now})
+            self._vectors = vector[None, :] if self._vectors.size == 0 else np.vstack([self._vectors, vector])
+    
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+            self._entries = []
+    
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
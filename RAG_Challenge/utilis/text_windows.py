@@ -0,0 +1,151 @@
+"""
+Sliding-window extraction over long texts, with per-document token budgets
+"""
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def sliding_windows(text: str, size: Optional[int], overlap: int = 0) -> List[Tuple[int, str]]:
+    """Split text into overlapping (start offset, window) pairs, breaking at whitespace where possible
+    
+    With no size, or a text that already fits, the whole text is one window.
+    """
+    if not size or len(text) <= size:
+        return [(0, text)]
+    
+    overlap = max(0, min(overlap, size // 2))
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Do not cut a word in half when a space is reasonably close
+            space = text.rfind(" ", start + size // 2, end)
+            if space > 0:
+                end = space
+        windows.append((start, text[start:end]))
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return windows
+
+def merge_window_entities(windows: List[Tuple[int, str]],
+                          window_entities: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Combine per-window entities into text offsets, once per span
+    
+    Each overlap is split at its midpoint and a window keeps only the entities
+    starting on its side, so a name cut off at a window edge is taken from the
+    neighbouring window where it is whole.
+    """
+    merged = {}
+    for k, ((start, window), entities) in enumerate(zip(windows, window_entities)):
+        low = 0 if k == 0 else (start + windows[k - 1][0] + len(windows[k - 1][1])) // 2
+        high = None if k == len(windows) - 1 else (windows[k + 1][0] + start + len(window)) // 2
+        for entity in entities:
+            shifted = dict(entity, start=entity["start"] + start, end=entity["end"] + start)
+            if shifted["start"] < low or (high is not None and shifted["start"] >= high):
+                continue
+            merged.setdefault((shifted["start"], shifted["end"]), shifted)
+    return [merged[span] for span in sorted(merged)]
+
+def dedupe_relations(relations: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Drop relations repeated across windows (case and whitespace insensitive)"""
+    seen = set()
+    unique = []
+    for relation in relations:
+        key = tuple(" ".join(str(relation.get(field, "")).split()).casefold()
+                    for field in ("subject", "relation", "object"))
+        if key not in seen:
+            seen.add(key)
+            unique.append(relation)
+    return unique
+
+
+class WindowPlan:
+    """Windows of a document's texts that are sent to the LLM, in order, under a token budget
+    
+    Once the budget is spent the remaining windows are left out and counted,
+    so coverage shows how much of the document was actually read. Windows of
+    max_chars or more stay in the plan but are not sent (the extractor skips
+    them), so they count as neither covered nor spent.
+    """
+    
+    def __init__(self, texts: List[str], window_chars: Optional[int], overlap: int,
+                 estimate_tokens: Callable[[str], int], token_budget: int = 0,
+                 max_chars: Optional[int] = None):
+        """token_budget of 0 means no limit"""
+        self.num_texts = len(texts)
+        self.windows: List[Tuple[int, int, str]] = []  # (text index, start offset, window)
+        self.total_windows = 0
+        self.total_chars = sum(len(text) for text in texts)
+        self.covered_chars = 0
+        self.tokens = 0
+        self.token_budget = token_budget
+        self.too_long = 0
+        self._incomplete = set()
+        
+        exhausted = False
+        for index, text in enumerate(texts):
+            previous_end = 0
+            for start, window in sliding_windows(text, window_chars, overlap):
+                self.total_windows += 1
+                if max_chars and len(window) >= max_chars:
+                    self.too_long += 1
+                    self.windows.append((index, start, window))
+                    continue
+                
+                tokens = estimate_tokens(window)
+                if exhausted or (token_budget and self.tokens + tokens > token_budget):
+                    exhausted = True
+                    self._incomplete.add(index)
+                    continue
+                
+                self.tokens += tokens
+                self.windows.append((index, start, window))
+                end = start + len(window)
+                self.covered_chars += end - max(start, previous_end)
+                previous_end = end
+        
+        if exhausted:
+            logger.warning(
+                f"⚠️ Token budget of {token_budget} reached: {self.skipped_windows} of "
+                f"{self.total_windows} windows not sent to the LLM"
+            )
+    
+    @property
+    def skipped_windows(self) -> int:
+        """Windows left out because the token budget ran out"""
+        return self.total_windows - len(self.windows)
+    
+    def complete(self, index: int) -> bool:
+        """Whether every window of a text is in the plan"""
+        return index not in self._incomplete
+
+def extract_windows(extractor, plan: WindowPlan) -> Iterator[Tuple[int, Optional[List[Dict[str, str]]]]]:
+    """Yield (text index, relations) once all of a text's planned windows are extracted
+    
+    Relations repeated in overlapping windows are merged. relations is None if
+    any window of the text failed after all retries.
+    """
+    remaining = Counter(index for index, _, _ in plan.windows)
+    collected = defaultdict(list)
+    failed = set()
+    
+    # Texts whose windows were all cut by the budget have nothing to wait for
+    for index in range(plan.num_texts):
+        if index not in remaining:
+            yield index, []
+    
+    for position, relations in extractor.extract_many([window for _, _, window in plan.windows]):
+        index = plan.windows[position][0]
+        if relations is None:
+            failed.add(index)
+        else:
+            collected[index].extend(relations)
+        
+        remaining[index] -= 1
+        if remaining[index] == 0:
+            relations = collected.pop(index, [])
+            yield index, None if index in failed else dedupe_relations(relations)